@@ -2,25 +2,24 @@
 
 import argparse
 from rich.console import Console
-from functools import lru_cache
+from functools import lru_cache, wraps
+from contextlib import contextmanager
 import time
 import random
 import sys
 import threading
+import queue
+import atexit
+import signal
 import os
 from pathlib import Path
 import shutil
+import glob
 import subprocess
 import sysconfig
-import PyPDF2
-from docx import Document
 import json
-from prompt_toolkit import PromptSession
-from prompt_toolkit.key_binding import KeyBindings
-import pyperclip
-import pynvml
-import psutil
-import cpuinfo
+import zlib
+import itertools
 import re
 from difflib import SequenceMatcher
 
@@ -31,67 +30,397 @@ console = Console()
 query_history = []
 query_streak = 0
 
-# Path to the history file
+# Path to the legacy history file (single JSON array, migrated on first use)
 HISTORY_FILE = Path.home() / ".delta" / "history.json"
 
-def save_interaction(user_input, response):
-    """Save a chat interaction to the history file."""
-    timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-    interaction = {
-        "timestamp": timestamp,
+# Append-only history log: numbered JSONL segments rotated by size
+HISTORY_DIR = Path.home() / ".delta" / "history"
+HISTORY_LOCK_FILE = HISTORY_DIR / ".lock"
+HISTORY_SEGMENT_BYTES = 4 * 1024 * 1024  # Rotate segments at 4 MB
+
+@contextmanager
+def file_lock(lock_path):
+    """Hold an exclusive advisory lock on lock_path for the duration of the block."""
+    lock_path = Path(lock_path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, 'a+') as f:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after ~10s, keep waiting
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == 'nt':
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def history_segments():
+    """Return the history segment files in write order."""
+    if not HISTORY_DIR.exists():
+        return []
+    return sorted(HISTORY_DIR.glob("*.jsonl"))
+
+def ends_with_torn_line(path):
+    """True if path is a non-empty file whose last line has no trailing newline."""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+    except FileNotFoundError:
+        return False
+
+def _append_history_records(records):
+    """Append records to the newest segment, rotating it first if full. Caller holds the lock."""
+    segments = history_segments()
+    if segments and segments[-1].stat().st_size < HISTORY_SEGMENT_BYTES:
+        segment = segments[-1]
+    else:
+        number = int(segments[-1].stem) + 1 if segments else 1
+        segment = HISTORY_DIR / f"{number:06d}.jsonl"
+    data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+    if ends_with_torn_line(segment):
+        data = "\n" + data  # Close the line a crash left open so the first new record stays parseable
+    with open(segment, 'a', encoding='utf-8') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+def migrate_legacy_history():
+    """Move interactions from the old history.json array into the segmented log (runs once)."""
+    if not HISTORY_FILE.exists():
+        return
+    with file_lock(HISTORY_LOCK_FILE):
+        if not HISTORY_FILE.exists():
+            return  # Another process migrated while we waited for the lock
+        try:
+            with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except (ValueError, OSError) as e:
+            console.print(f"[yellow]Could not migrate {HISTORY_FILE}: {e}[/yellow]")
+            return
+        if legacy:
+            # Legacy entries predate everything already in the log, so write them to segments
+            # numbered before the existing ones.
+            existing = history_segments()
+            staged = HISTORY_DIR / "migrating"
+            staged.mkdir(exist_ok=True)
+            for old in existing:
+                old.rename(staged / old.name)
+            for start in range(0, len(legacy), 1000):
+                _append_history_records(legacy[start:start + 1000])
+            offset = len(history_segments())
+            for old in sorted(staged.glob("*.jsonl")):
+                old.rename(HISTORY_DIR / f"{int(old.stem) + offset:06d}.jsonl")
+            staged.rmdir()
+        HISTORY_FILE.rename(HISTORY_FILE.with_name(HISTORY_FILE.name + ".migrated"))
+
+def make_interaction(user_input, response):
+    """Build a history record stamped with the current local time."""
+    return {
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
         "user_input": user_input,
         "response": response
     }
-    
-    # Ensure the directory exists
-    HISTORY_FILE.parent.mkdir(exist_ok=True)
-    
-    # Initialize the file if it doesn't exist
-    if not HISTORY_FILE.exists():
-        with open(HISTORY_FILE, 'w') as f:
-            json.dump([], f)
-    
-    # Append the new interaction
-    with open(HISTORY_FILE, 'r+') as f:
-        history = json.load(f)
-        history.append(interaction)
-        f.seek(0)
-        f.truncate()
-        json.dump(history, f, indent=4)
-
-def display_history():
-    """Display the chat history from the history file."""
-    if not HISTORY_FILE.exists():
-        console.print("[yellow]No chat history found.[/yellow]")
+
+def write_interactions(records):
+    """Append records to the history log in one locked write and update the search index."""
+    migrate_legacy_history()
+    with file_lock(HISTORY_LOCK_FILE):
+        _append_history_records(records)
+    try:
+        conn = open_history_index()
+        try:
+            sync_history_index(conn)
+        finally:
+            conn.close()
+    except Exception as e:
+        # The log is the source of truth; the index catches up on the next sync
+        console.print(f"[yellow]Could not update history index: {e}[/yellow]")
+
+def save_interaction(user_input, response):
+    """Append a chat interaction to the history log."""
+    write_interactions([make_interaction(user_input, response)])
+
+# Background history persistence
+HISTORY_QUEUE_SIZE = 256  # Interactions buffered before submit() blocks
+HISTORY_BATCH_SIZE = 64   # Interactions written per lock/fsync
+
+class HistoryWriter:
+    """Persist interactions on a background thread so the chat loop never waits on disk."""
+
+    _STOP = object()
+
+    def __init__(self, maxsize=HISTORY_QUEUE_SIZE):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.saved = 0
+        self.flushes = 0
+        self.total_flush_time = 0.0
+        self.max_flush_time = 0.0
+        self.max_queue_depth = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="delta-history-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, user_input, response):
+        """Queue an interaction; only blocks if the writer is a full queue behind."""
+        self.queue.put(make_interaction(user_input, response))
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is self._STOP:
+                break
+            batch = [item]
+            while len(batch) < HISTORY_BATCH_SIZE:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+
+    def _flush(self, batch):
+        start = time.perf_counter()
+        try:
+            write_interactions(batch)
+            self.saved += len(batch)
+        except Exception as e:
+            console.print(f"[red]Error saving history: {e}[/red]")
+        elapsed = time.perf_counter() - start
+        self.flushes += 1
+        self.total_flush_time += elapsed
+        self.max_flush_time = max(self.max_flush_time, elapsed)
+
+    def close(self, timeout=10):
+        """Flush everything still queued and stop the thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self.queue.put(self._STOP)
+        self._thread.join(timeout)
+
+    def stats(self):
+        """Queue depth and flush latency figures for this session."""
+        return {
+            "saved": self.saved,
+            "pending": self.queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "flushes": self.flushes,
+            "avg_flush_ms": 1000 * self.total_flush_time / self.flushes if self.flushes else 0.0,
+            "max_flush_ms": 1000 * self.max_flush_time,
+        }
+
+def iter_history():
+    """Yield interactions oldest first, skipping lines torn by a crash mid-write."""
+    migrate_legacy_history()
+    for segment in history_segments():
+        with open(segment, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+def display_history(search=None, limit=None, since=None, page=1):
+    """Display chat history, optionally filtered by a full-text search, one page at a time."""
+    if search is not None and not search.strip():
+        console.print("[red]Error: --search needs at least one word[/red]")
         return
-    
-    with open(HISTORY_FILE, 'r') as f:
-        history = json.load(f)
-        for interaction in history:
-            console.print(f"[bold cyan]{interaction['timestamp']}[/bold cyan]")
-            console.print(f"[bold]User:[/bold] {interaction['user_input']}")
-            console.print(f"[bold]Assistant:[/bold] {interaction['response']}")
-            console.print("---")
+    if search:
+        limit = limit or 20
+        rows = search_history(search, limit=limit, since=since, page=page)
+    else:
+        # Stream the log so only the requested page is ever held in memory
+        skip = (page - 1) * limit if limit else 0
+        rows = (
+            (i['timestamp'], i['user_input'], i['response'])
+            for i in iter_history()
+            if not since or i['timestamp'] >= since
+        )
+        rows = itertools.islice(rows, skip, skip + limit if limit else None)
+    shown = 0
+    for row in rows:
+        shown += 1
+        print_interaction(*row)
+    if not shown:
+        console.print("[yellow]No chat history found.[/yellow]")
+    elif limit and shown == limit:
+        console.print(f"[italic]Page {page}. Use --page {page + 1} for more.[/italic]")
 
 def clear_history():
-    """Clear the chat history file."""
-    if HISTORY_FILE.exists():
-        with open(HISTORY_FILE, 'w') as f:
-            json.dump([], f)
-        console.print("[green]Chat history cleared.[/green]")
-    else:
+    """Clear the chat history log."""
+    migrate_legacy_history()
+    segments = history_segments()
+    if not segments:
         console.print("[yellow]No chat history to clear.[/yellow]")
+        return
+    with file_lock(HISTORY_LOCK_FILE):
+        for segment in history_segments():
+            segment.unlink()
+        if HISTORY_INDEX_FILE.exists():
+            HISTORY_INDEX_FILE.unlink()
+    console.print("[green]Chat history cleared.[/green]")
+
+# Full-text index over the history log, kept in step with it by byte offset
+HISTORY_INDEX_FILE = HISTORY_DIR / "index.sqlite3"
+
+def open_history_index():
+    """Open (creating if needed) the SQLite index of the history log."""
+    import sqlite3
+    HISTORY_DIR.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(HISTORY_INDEX_FILE), timeout=30)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS interactions (
+            id INTEGER PRIMARY KEY,
+            timestamp TEXT,
+            user_input TEXT,
+            response TEXT
+        );
+        CREATE INDEX IF NOT EXISTS interactions_timestamp ON interactions(timestamp);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+    """)
+    try:
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS interactions_fts USING fts5("
+            "user_input, response, content='interactions', content_rowid='id')"
+        )
+    except sqlite3.OperationalError:
+        pass  # SQLite built without FTS5; search falls back to LIKE scans
+    return conn
+
+def _has_fts(conn):
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'interactions_fts'").fetchone()
+    return row is not None
+
+def sync_history_index(conn):
+    """Index log lines written since the last sync (by this or any other process)."""
+    has_fts = _has_fts(conn)
+    with conn:
+        # Take the write lock before reading the position, so two syncing processes can't both
+        # index the lines after the same offset
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT value FROM meta WHERE key = 'position'").fetchone()
+        segment_name, offset = json.loads(row[0]) if row else ("", 0)
+        for segment in history_segments():
+            if segment.name < segment_name:
+                continue
+            start = offset if segment.name == segment_name else 0
+            with open(segment, 'rb') as f:
+                f.seek(start)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # Still being written; pick it up next time
+                    start += len(line)
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    cursor = conn.execute(
+                        "INSERT INTO interactions (timestamp, user_input, response) VALUES (?, ?, ?)",
+                        (record.get('timestamp', ''), record.get('user_input', ''), record.get('response', ''))
+                    )
+                    if has_fts:
+                        conn.execute(
+                            "INSERT INTO interactions_fts (rowid, user_input, response) VALUES (?, ?, ?)",
+                            (cursor.lastrowid, record.get('user_input', ''), record.get('response', ''))
+                        )
+            segment_name, offset = segment.name, start
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('position', ?)",
+            (json.dumps([segment_name, offset]),)
+        )
+
+def _fts_query(term):
+    """Quote each word so user input is matched literally (implicit AND)."""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in term.split())
+
+def search_history(term, limit=20, since=None, page=1):
+    """Yield (timestamp, user_input, response) rows matching term, best match first."""
+    conn = open_history_index()
+    try:
+        sync_history_index(conn)
+        offset = (page - 1) * limit
+        if _has_fts(conn):
+            sql = (
+                "SELECT i.timestamp, i.user_input, i.response FROM interactions_fts "
+                "JOIN interactions i ON i.id = interactions_fts.rowid "
+                "WHERE interactions_fts MATCH ?"
+            )
+            params = [_fts_query(term)]
+            if since:
+                sql += " AND i.timestamp >= ?"
+                params.append(since)
+            sql += " ORDER BY bm25(interactions_fts) LIMIT ? OFFSET ?"
+        else:
+            sql = "SELECT timestamp, user_input, response FROM interactions WHERE (user_input LIKE ? OR response LIKE ?)"
+            params = [f"%{term}%", f"%{term}%"]
+            if since:
+                sql += " AND timestamp >= ?"
+                params.append(since)
+            sql += " ORDER BY id DESC LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        for row in conn.execute(sql, params):
+            yield row
+    finally:
+        conn.close()
 
-def think_about_question(model_name, question):
+def parse_since(value):
+    """Validate a --since value (YYYY-MM-DD or YYYY-MM-DD HH:MM:SS) and return it normalised."""
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            return time.strftime("%Y-%m-%d %H:%M:%S", time.strptime(value, fmt))
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"invalid date '{value}', expected YYYY-MM-DD")
+
+def print_interaction(timestamp, user_input, response):
+    """Print a single history entry."""
+    console.print(f"[bold cyan]{timestamp}[/bold cyan]")
+    console.print(f"[bold]User:[/bold] {user_input}")
+    console.print(f"[bold]Assistant:[/bold] {response}")
+    console.print("---")
+
+async def think_about_question(model_name, question, num_ctx=512, keep_alive=None):
     """Analyze question for key concepts and intent (minimal output)."""
-    import ollama
     think_prompt = f"Analyze this question and identify key concepts, intent and potential ambiguities without answering it: '{question}'"
-    response = ollama.generate(model=model_name, prompt=think_prompt, options={'num_ctx': 512}, stream=True)
+    pool = get_host_pool()
+    if pool is not None:
+        response = pool.astream(model_name, 'generate', prompt=think_prompt, options={'num_ctx': num_ctx}, keep_alive=keep_alive)
+    else:
+        response = get_ollama_client().astream('generate', model=model_name, prompt=think_prompt, options={'num_ctx': num_ctx}, keep_alive=keep_alive)
     thought = ""
-    for chunk in response:
-        content = chunk.get('message', {}).get('content', '')
-        console.print(content, end="", style="italic grey50")
-        thought += content
+    renderer = StreamRenderer(style="italic grey50")
+    try:
+        async for chunk in response:
+            if chunk.get('failover'):
+                renderer.reset()
+                console.print()
+                thought = ""  # Restarted on another host
+                continue
+            content = chunk.get('response', '')
+            renderer.write(content)
+            thought += content
+    finally:
+        renderer.close()
     console.print()
     return thought
 
@@ -104,15 +433,232 @@ def preprocess_query(query):
     words = [word for word in query.split() if word not in stop_words]
     return ' '.join(words)
 
+def refine_query(question, thought, max_terms=5):
+    """Extend the question with the most frequent new content words from the think pass."""
+    seen = set(preprocess_query(question).split())
+    counts = {}
+    for word in preprocess_query(thought).split():
+        if word not in seen and len(word) > 3:
+            counts[word] = counts.get(word, 0) + 1
+    extra = sorted(counts, key=lambda word: -counts[word])[:max_terms]
+    return " ".join([question] + extra) if extra else question
+
 def similarity_score(a, b):
     """Calculate similarity between two strings."""
     return SequenceMatcher(None, a.lower(), b.lower()).ratio()
 
+# Persistent retrieval cache shared by all sessions
+RETRIEVAL_CACHE_FILE = Path.home() / ".delta" / "cache" / "retrieval.sqlite3"
+RETRIEVAL_CACHE_BYTES = 64 * 1024 * 1024  # Compressed size cap before LRU eviction
+RETRIEVAL_CACHE_TTL = {
+    "wiki": 7 * 24 * 3600,    # Encyclopedia pages change slowly
+    "arxiv": 30 * 24 * 3600,  # Abstracts are effectively immutable
+    "ddg": 6 * 3600,          # Web results go stale quickly
+}
+
+def open_retrieval_cache():
+    """Open (creating if needed) the on-disk retrieval cache."""
+    import sqlite3
+    RETRIEVAL_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(RETRIEVAL_CACHE_FILE), timeout=30)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS entries (
+            source TEXT,
+            query TEXT,
+            value BLOB,
+            size INTEGER,
+            created REAL,
+            accessed REAL,
+            PRIMARY KEY (source, query)
+        );
+        CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed);
+        CREATE TABLE IF NOT EXISTS counters (
+            source TEXT PRIMARY KEY,
+            hits INTEGER DEFAULT 0,
+            misses INTEGER DEFAULT 0
+        );
+    """)
+    return conn
+
+def normalize_query(query):
+    """Collapse case and whitespace so trivially different queries share a cache entry."""
+    return " ".join(query.lower().split())
+
+def _count_cache(conn, source, column):
+    conn.execute("INSERT OR IGNORE INTO counters (source) VALUES (?)", (source,))
+    conn.execute(f"UPDATE counters SET {column} = {column} + 1 WHERE source = ?", (source,))
+
+def retrieval_cache_get(source, query, allow_stale=False, count=True):
+    """Return a cached (context, citations, images, url) tuple, or None on a miss or expiry.
+
+    count=False leaves the hit/miss counters alone, for a second look within one lookup.
+    """
+    key = normalize_query(query)
+    now = time.time()
+    conn = open_retrieval_cache()
+    try:
+        with conn:
+            row = conn.execute(
+                "SELECT value, created FROM entries WHERE source = ? AND query = ?", (source, key)
+            ).fetchone()
+            if row and (allow_stale or now - row[1] <= RETRIEVAL_CACHE_TTL.get(source, 24 * 3600)):
+                conn.execute("UPDATE entries SET accessed = ? WHERE source = ? AND query = ?", (now, source, key))
+                if count:
+                    _count_cache(conn, source, "hits")
+                context, citations, images, url = json.loads(zlib.decompress(row[0]))
+                return context, citations, images, url
+            if count:
+                _count_cache(conn, source, "misses")
+            return None
+    finally:
+        conn.close()
+
+def retrieval_cache_put(source, query, result):
+    """Store a result, then evict least recently used entries beyond the size cap."""
+    value = zlib.compress(json.dumps(list(result)).encode('utf-8'), 6)
+    now = time.time()
+    conn = open_retrieval_cache()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (source, query, value, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (source, normalize_query(query), value, len(value), now, now)
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > RETRIEVAL_CACHE_BYTES:
+                for rowid, size in conn.execute("SELECT rowid, size FROM entries ORDER BY accessed").fetchall():
+                    conn.execute("DELETE FROM entries WHERE rowid = ?", (rowid,))
+                    total -= size
+                    if total <= RETRIEVAL_CACHE_BYTES:
+                        break
+    finally:
+        conn.close()
+
+def persistent_cache(source):
+    """Serve a fetcher from the on-disk cache; only non-empty results are stored."""
+    def decorator(fetch):
+        @wraps(fetch)
+        def wrapper(query):
+            try:
+                cached = retrieval_cache_get(source, query)
+            except Exception:
+                cached = None  # A broken cache must never block retrieval
+            if cached is not None:
+                console.print(f"♻️ [yellow]{source}: served from cache[/yellow]")
+                return cached
+            result = fetch(query)
+            if result[0]:
+                try:
+                    retrieval_cache_put(source, query, result)
+                except Exception as e:
+                    console.print(f"[yellow]Could not cache {source} result: {e}[/yellow]")
+            return result
+        return wrapper
+    return decorator
+
+def retrieval_cache_stats():
+    """Return per-source hit/miss counters plus entry count and stored bytes."""
+    if not RETRIEVAL_CACHE_FILE.exists():
+        return {}
+    conn = open_retrieval_cache()
+    try:
+        stats = {}
+        for source, hits, misses in conn.execute("SELECT source, hits, misses FROM counters"):
+            stats[source] = {"hits": hits, "misses": misses, "entries": 0, "bytes": 0}
+        for source, entries, size in conn.execute("SELECT source, COUNT(*), SUM(size) FROM entries GROUP BY source"):
+            stats.setdefault(source, {"hits": 0, "misses": 0})
+            stats[source].update(entries=entries, bytes=size or 0)
+        return stats
+    finally:
+        conn.close()
+
+def display_cache_stats():
+    """Print retrieval cache usage per source."""
+    from rich.table import Table
+    stats = retrieval_cache_stats()
+    if stats:
+        table = Table(show_header=True, header_style="bold magenta")
+        table.add_column("Source", style="cyan")
+        table.add_column("Entries", justify="right")
+        table.add_column("Size", justify="right")
+        table.add_column("Hits", justify="right")
+        table.add_column("Misses", justify="right")
+        table.add_column("Hit Rate", justify="right")
+        for source, row in sorted(stats.items()):
+            lookups = row["hits"] + row["misses"]
+            rate = f"{100 * row['hits'] / lookups:.0f}%" if lookups else "N/A"
+            table.add_row(source, str(row["entries"]), f"{row['bytes'] / 1024:.1f} KB", str(row["hits"]), str(row["misses"]), rate)
+        console.print("🗄️ [bold]Retrieval Cache:[/bold]")
+        console.print(table)
+    else:
+        console.print("[yellow]Retrieval cache is empty.[/yellow]")
+    if DOCUMENT_CACHE_DIR.exists():
+        blobs = list(DOCUMENT_CACHE_DIR.glob("*.json.z"))
+        size = sum(blob.stat().st_size for blob in blobs)
+        console.print(f"📄 Document cache: {len(blobs)} parsed file(s), {size / 1e6:.1f} MB")
+    tokens, wait = _peek_ddg_bucket()
+    next_request = f", next in {wait:.0f}s" if wait else ""
+    console.print(f"🪣 DuckDuckGo budget: {int(tokens)}/{DDG_BUCKET_CAPACITY} requests available{next_request}")
+
+def clear_retrieval_cache():
+    """Delete the on-disk retrieval and parsed-document caches."""
+    cleared = False
+    if RETRIEVAL_CACHE_FILE.exists():
+        RETRIEVAL_CACHE_FILE.unlink()
+        cleared = True
+    if DOCUMENT_CACHE_DIR.exists():
+        shutil.rmtree(DOCUMENT_CACHE_DIR)
+        cleared = True
+    if cleared:
+        console.print("[green]Retrieval cache cleared.[/green]")
+    else:
+        console.print("[yellow]No retrieval cache to clear.[/yellow]")
+
+def submit_daemon(fn, name):
+    """Run fn on a daemon thread and return a Future for its result.
+
+    Used for network fetches that may be abandoned at a deadline: ThreadPoolExecutor workers
+    are joined at interpreter exit, so a hung source would keep Delta from exiting.
+    """
+    from concurrent.futures import Future
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return future
+
+# Wikipedia candidate fetching
+WIKI_DEADLINE = 8.0   # Seconds to wait for candidate pages before ranking whatever arrived
+
+def load_wikipedia_page(title):
+    """Resolve a search hit to a page, following the first option of a disambiguation page."""
+    import wikipedia
+    try:
+        return wikipedia.page(title, auto_suggest=False)
+    except wikipedia.exceptions.DisambiguationError as e:
+        if e.options:
+            return wikipedia.page(e.options[0], auto_suggest=False)
+    return None
+
+def first_sentences(text, count=3):
+    """Return the first count sentences of text."""
+    sentences = re.split(r'(?<=[.!?])\s+', text.strip())
+    return " ".join(sentences[:count])
+
 @lru_cache(maxsize=128)
+@persistent_cache("wiki")
 def fetch_wikipedia_context(query):
     """Fetch concise context from Wikipedia with improved relevance and disambiguation handling."""
     import wikipedia
     from requests.exceptions import RequestException
+    from concurrent.futures import wait
 
     try:
         # Search for up to 3 results to find the most relevant
@@ -122,44 +668,35 @@ def fetch_wikipedia_context(query):
             console.print("[yellow]\nNo Wikipedia results found.[/yellow]")
             return "", [], [], ""
 
+        # Resolve all candidates at once, one thread each; only titles are needed to rank them
+        futures = [submit_daemon(lambda title=result: load_wikipedia_page(title), "delta-wiki") for result in search_results]
+        wait(futures, timeout=WIKI_DEADLINE)
+
         best_result = None
         best_score = 0
-        best_summary = ""
-        best_citations = []
-        best_url = ""
-
-        for result in search_results:
-            try:
-                page = wikipedia.page(result, auto_suggest=False)
-                summary = wikipedia.summary(result, sentences=3, auto_suggest=False)
-                score = similarity_score(processed_query, page.title)
-                if score > best_score:
-                    best_score = score
-                    best_result = page
-                    best_summary = summary[:1000] + "..." if len(summary) > 1000 else summary
-                    best_citations = page.references[:3]
-                    best_url = page.url
-            except wikipedia.exceptions.DisambiguationError as e:
-                # Try the first option from disambiguation
-                if e.options:
-                    try:
-                        page = wikipedia.page(e.options[0], auto_suggest=False)
-                        summary = wikipedia.summary(e.options[0], sentences=3, auto_suggest=False)
-                        score = similarity_score(processed_query, page.title)
-                        if score > best_score:
-                            best_score = score
-                            best_result = page
-                            best_summary = summary[:1000] + "..." if len(summary) > 1000 else summary
-                            best_citations = page.references[:3]
-                            best_url = page.url
-                    except Exception:
-                        continue
-            except wikipedia.exceptions.PageError:
+        for future in futures:
+            if not future.done() or future.exception() is not None:
+                continue
+            page = future.result()
+            if page is None:
                 continue
+            score = similarity_score(processed_query, page.title)
+            if score > best_score:
+                best_score = score
+                best_result = page
 
         if best_result:
+            # Summary and references are lazy page properties: fetch them for the winner only
+            summary_future = submit_daemon(lambda: best_result.summary, "delta-wiki")
+            references_future = submit_daemon(lambda: best_result.references[:3], "delta-wiki")
+            summary = first_sentences(summary_future.result())
+            try:
+                citations = references_future.result()
+            except Exception:
+                citations = []
+            summary = summary[:1000] + "..." if len(summary) > 1000 else summary
             console.print(f"\n📖 [yellow]Wiki: {best_result.title}[/yellow]")
-            return best_summary, best_citations, [], best_url
+            return summary, citations, [], best_result.url
         else:
             console.print("[yellow]\nNo relevant Wikipedia page found after trying multiple results.[/yellow]")
             return "", [], [], ""
@@ -168,6 +705,7 @@ def fetch_wikipedia_context(query):
         return "", [], [], ""
 
 @lru_cache(maxsize=128)
+@persistent_cache("arxiv")
 def fetch_arxiv_context(query):
     """Fetch concise context from arXiv."""
     import arxiv
@@ -186,159 +724,1848 @@ def fetch_arxiv_context(query):
         console.print(f"❌ [red]arXiv Error: {str(e)}[/red]")
         return "", [], [], ""
 
-# Rate limiting parameters
-MIN_INTERVAL = 300  # 5 minutes between requests
-RATE_LIMIT_FILE = Path.home() / ".delta" / "ddg_last_request.txt"
+# DuckDuckGo token bucket, shared by every Delta process through a locked state file
+DDG_BUCKET_CAPACITY = 3      # Requests that may be made back to back
+DDG_REFILL_INTERVAL = 100.0  # Seconds to earn one request back
+DDG_BUCKET_FILE = Path.home() / ".delta" / "ddg_bucket.json"
+DDG_BUCKET_LOCK = Path.home() / ".delta" / "ddg_bucket.lock"
 
-def update_last_request_time():
-    """Update the timestamp of the last DuckDuckGo request."""
-    RATE_LIMIT_FILE.parent.mkdir(exist_ok=True)
-    with open(RATE_LIMIT_FILE, "w") as f:
-        f.write(str(time.time()))
-
-def get_last_request_time():
-    """Read the timestamp of the last DuckDuckGo request."""
-    if RATE_LIMIT_FILE.exists():
-        with open(RATE_LIMIT_FILE, "r") as f:
-            try:
-                return float(f.read().strip())
-            except ValueError:
-                return 0
-    return 0
-
-@lru_cache(maxsize=128)
-def fetch_duckduckgo_context(query):
-    """Fetch concise context from DuckDuckGo with strict rate limiting."""
-    current_time = time.time()
-    last_request_time = get_last_request_time()
-    time_since_last = current_time - last_request_time
+def _read_ddg_bucket(now):
+    """Tokens in the bucket at time now, refilled for the time since it was last written."""
+    try:
+        with open(DDG_BUCKET_FILE, 'r') as f:
+            state = json.load(f)
+        tokens, updated = float(state["tokens"]), float(state["updated"])
+    except (OSError, ValueError, KeyError, TypeError):
+        tokens, updated = float(DDG_BUCKET_CAPACITY), now
+    return min(DDG_BUCKET_CAPACITY, tokens + max(0.0, now - updated) / DDG_REFILL_INTERVAL)
+
+def _ddg_wait(tokens):
+    return 0.0 if tokens >= 1 else (1 - tokens) * DDG_REFILL_INTERVAL
+
+def _update_ddg_bucket(take=0, drain=False):
+    """Refill the bucket for elapsed time, then optionally take tokens or empty it.
+
+    Returns (granted, tokens_left, seconds_until_next_token).
+    """
+    with file_lock(DDG_BUCKET_LOCK):
+        now = time.time()
+        tokens = _read_ddg_bucket(now)
+        granted = tokens >= take
+        if granted:
+            tokens -= take
+        if drain:
+            tokens = 0.0
+        with open(DDG_BUCKET_FILE, 'w') as f:
+            json.dump({"tokens": tokens, "updated": now}, f)
+    return granted, tokens, _ddg_wait(tokens)
+
+def _peek_ddg_bucket():
+    """(tokens_left, seconds_until_next_token) without taking the lock or writing the state."""
+    tokens = _read_ddg_bucket(time.time())
+    return tokens, _ddg_wait(tokens)
+
+def query_duckduckgo(query):
+    """Run one DuckDuckGo text search and format it as a context tuple."""
+    from duckduckgo_search import DDGS
 
-    # Enforce minimum interval between requests
-    if time_since_last < MIN_INTERVAL:
-        wait_time = MIN_INTERVAL - time_since_last
-        console.print(f"[yellow]Rate limit: Waiting {wait_time:.1f} seconds before next request...[/yellow]")
-        time.sleep(wait_time)
+    # Enhanced browser-like headers
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.5",
+        "Accept-Encoding": "gzip, deflate, br",
+        "Referer": "https://www.google.com/",
+        "Connection": "keep-alive"
+    }
+    with DDGS(timeout=20, headers=headers) as ddgs:
+        results = ddgs.text(query, region='wt-wt', safesearch='off', timelimit='y', max_results=2)
+    if results:
+        context = ""
+        citations = []
+        for i, result in enumerate(results, 1):
+            snippet = result['body'][:200] + "..." if len(result['body']) > 200 else result['body']
+            context += f"Result {i}: {snippet}\n"
+            citations.append(result['href'])
+        return context, citations, [], citations[0] if citations else ""
+    return "", [], [], ""
 
-    # Update timestamp before making the request
-    update_last_request_time()
+# Queries waiting for a token; refreshed in the background straight into the retrieval cache
+_ddg_refresh_queue = queue.Queue()
+_ddg_refresh_pending = set()
+_ddg_refresh_lock = threading.Lock()
+_ddg_refresh_thread = None
 
-    from duckduckgo_search import DDGS
+def _ddg_refresh_worker():
+    while True:
+        query = _ddg_refresh_queue.get()
+        try:
+            while True:
+                granted, _, wait = _update_ddg_bucket(take=1)
+                if granted:
+                    break
+                time.sleep(wait)
+            result = query_duckduckgo(query)
+            if result[0]:
+                retrieval_cache_put("ddg", query, result)
+        except Exception as e:
+            if "Ratelimit" in str(e):
+                _update_ddg_bucket(drain=True)
+        finally:
+            with _ddg_refresh_lock:
+                _ddg_refresh_pending.discard(normalize_query(query))
+
+def schedule_ddg_refresh(query):
+    """Fetch query once the bucket refills, without making anyone wait for it."""
+    global _ddg_refresh_thread
+    with _ddg_refresh_lock:
+        key = normalize_query(query)
+        if key in _ddg_refresh_pending:
+            return
+        _ddg_refresh_pending.add(key)
+        if _ddg_refresh_thread is None:
+            _ddg_refresh_thread = threading.Thread(target=_ddg_refresh_worker, name="delta-ddg-refresh", daemon=True)
+            _ddg_refresh_thread.start()
+    _ddg_refresh_queue.put(query)
 
+def fetch_duckduckgo_context(query):
+    """Fetch concise context from DuckDuckGo without ever sleeping on the rate limit."""
     try:
-        # Enhanced browser-like headers
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Accept-Encoding": "gzip, deflate, br",
-            "Referer": "https://www.google.com/",
-            "Connection": "keep-alive"
-        }
-        with DDGS(timeout=20, headers=headers) as ddgs:
-            results = ddgs.text(query, region='wt-wt', safesearch='off', timelimit='y', max_results=2)
-        if results:
-            context = ""
-            citations = []
-            for i, result in enumerate(results, 1):
-                snippet = result['body'][:200] + "..." if len(result['body']) > 200 else result['body']
-                context += f"Result {i}: {snippet}\n"
-                citations.append(result['href'])
-            console.print(f"🌐 [yellow]DuckDuckGo: {query}[/yellow]")
-            return context, citations, [], citations[0] if citations else ""
+        cached = retrieval_cache_get("ddg", query)
+    except Exception:
+        cached = None  # A broken cache must never block retrieval
+    if cached is not None:
+        console.print("♻️ [yellow]ddg: served from cache[/yellow]")
+        return cached
+
+    granted, tokens, wait = _update_ddg_bucket(take=1)
+    if not granted:
+        # Bucket empty: answer now with whatever we have and refresh once a token is free
+        schedule_ddg_refresh(query)
+        try:
+            stale = retrieval_cache_get("ddg", query, allow_stale=True, count=False)  # Already counted as a miss
+        except Exception:
+            stale = None
+        if stale is not None:
+            console.print(f"[yellow]DuckDuckGo budget used up (next request in {wait:.0f}s); using an older cached result and refreshing in the background.[/yellow]")
+            return stale
+        console.print(f"[yellow]DuckDuckGo budget used up (next request in {wait:.0f}s); answering without web results, a refresh is queued.[/yellow]")
         return "", [], [], ""
+
+    try:
+        result = query_duckduckgo(query)
+        if result[0]:
+            console.print(f"🌐 [yellow]DuckDuckGo: {query}[/yellow] [dim]({int(tokens)}/{DDG_BUCKET_CAPACITY} requests left)[/dim]")
+            try:
+                retrieval_cache_put("ddg", query, result)
+            except Exception as e:
+                console.print(f"[yellow]Could not cache ddg result: {e}[/yellow]")
+        return result
     except Exception as e:
         error_msg = str(e)
         if "Ratelimit" in error_msg:
-            console.print(f"[yellow]Rate limit hit: {error_msg}. Please wait {MIN_INTERVAL/60:.1f} minutes before trying again.[/yellow]")
+            # The server disagrees with our budget: empty the shared bucket so every process backs off
+            _update_ddg_bucket(drain=True)
+            console.print(f"[yellow]Rate limit hit: {error_msg}. DuckDuckGo requests are paused for {DDG_REFILL_INTERVAL:.0f} seconds.[/yellow]")
             return "", [], [], ""
         else:
             console.print(f"❌ [red]DuckDuckGo Error: {error_msg}[/red]")
             return "", [], [], ""
 
+# Streaming extraction: each reader yields (location, text) blocks so callers hold one
+# page or paragraph at a time and can stop early
+TEXT_BLOCK_CHARS = 64 * 1024  # Upper bound on one block of a plain-text file
+
+# The readers raise when a file can't be read, so callers can tell a failed read (worth
+# retrying) from a file that really is empty
+def iter_text_file(file_path):
+    """Yield (line_number, text) blocks of a text file, split at blank lines."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        block, start, size = [], 1, 0
+        for number, line in enumerate(f, 1):
+            block.append(line)
+            size += len(line)
+            if not line.strip() or size >= TEXT_BLOCK_CHARS:
+                yield start, "".join(block)
+                block, start, size = [], number + 1, 0
+        if block:
+            yield start, "".join(block)
+
+def iter_pdf_pages(file_path):
+    """Yield (page_number, text) for each page of a PDF."""
+    import PyPDF2
+    with open(file_path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        for number, page in enumerate(reader.pages, 1):
+            yield number, page.extract_text() or ""
+
+def iter_docx_paragraphs(file_path):
+    """Yield (paragraph_number, text) for each paragraph of a DOCX file."""
+    from docx import Document
+    doc = Document(file_path)
+    for number, paragraph in enumerate(doc.paragraphs, 1):
+        yield number, paragraph.text + "\n"
+
 def read_text_file(file_path):
     """Read content from a text file."""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
-    except Exception as e:
-        console.print(f"[red]Error reading {file_path}: {e}[/red]")
-        return ""
+    return "".join(text for _, text in iter_text_file(file_path))
 
 def read_pdf_file(file_path):
     """Read content from a PDF file."""
-    try:
-        with open(file_path, 'rb') as f:
-            reader = PyPDF2.PdfReader(f)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() or ""
-            return text
-    except Exception as e:
-        console.print(f"[red]Error reading {file_path}: {e}[/red]")
-        return ""
+    return "".join(text for _, text in iter_pdf_pages(file_path))
 
 def read_docx_file(file_path):
     """Read content from a DOCX file."""
+    return "".join(text for _, text in iter_docx_paragraphs(file_path))
+
+# Passage retrieval over documents
+DOC_CHUNK_WORDS = 200    # Words per chunk
+DOC_CHUNK_OVERLAP = 50   # Words shared by consecutive chunks so answers are not cut in half
+DOC_CONTEXT_TOKENS = 1000  # Token budget for passages sent to the model per question
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+def estimate_tokens(text):
+    """Rough token count (about 1.3 tokens per English word) without loading a tokenizer."""
+    return int(len(text.split()) * 1.3) + 1
+
+def tokenize(text):
+    """Lowercase word tokens used for indexing and querying."""
+    return re.findall(r'\w+', text.lower())
+
+def chunk_blocks(blocks, size=DOC_CHUNK_WORDS, overlap=DOC_CHUNK_OVERLAP):
+    """Yield (chunk, location) windows of size words over a stream of (location, text) blocks.
+
+    Only the current window is held in memory; location is where the chunk starts.
+    """
+    window = []  # (word, location) pairs
+    fresh = 0    # Words in the window not yet emitted in any chunk
+    for location, text in blocks:
+        for word in text.split():
+            window.append((word, location))
+            fresh += 1
+            if len(window) == size:
+                yield " ".join(w for w, _ in window), window[0][1]
+                window = window[max(1, size - overlap):]
+                fresh = 0
+    if fresh:
+        yield " ".join(w for w, _ in window), window[0][1]
+
+def chunk_text(text, size=DOC_CHUNK_WORDS, overlap=DOC_CHUNK_OVERLAP):
+    """Split text into overlapping windows of size words."""
+    return [chunk for chunk, _ in chunk_blocks([(1, text)], size, overlap)]
+
+class BM25Index:
+    """Okapi BM25 over a list of passages, stored as term-sorted posting arrays."""
+
+    def __init__(self, passages, sources=None, locations=None):
+        import numpy as np
+        self.passages = passages
+        self.sources = sources or [""] * len(passages)
+        self.locations = locations or [None] * len(passages)
+        self.vocab = {}
+        term_ids, doc_ids, freqs = [], [], []
+        lengths = []
+        for doc_id, passage in enumerate(passages):
+            counts = {}
+            tokens = tokenize(passage)
+            lengths.append(len(tokens))
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                term_ids.append(self.vocab.setdefault(token, len(self.vocab)))
+                doc_ids.append(doc_id)
+                freqs.append(count)
+        term_ids = np.asarray(term_ids, dtype=np.int32)
+        order = np.argsort(term_ids, kind='stable')
+        self.post_docs = np.asarray(doc_ids, dtype=np.int32)[order]
+        self.post_tf = np.asarray(freqs, dtype=np.float32)[order]
+        doc_freq = np.bincount(term_ids, minlength=len(self.vocab))
+        self.offsets = np.concatenate(([0], np.cumsum(doc_freq))).astype(np.int64)
+        n = len(passages)
+        self.idf = np.log(1 + (n - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        self.doc_len = np.asarray(lengths, dtype=np.float32)
+        self.avgdl = float(self.doc_len.mean()) if n else 0.0
+
+    def scores(self, query):
+        """BM25 score of every passage for query."""
+        import numpy as np
+        scores = np.zeros(len(self.passages), dtype=np.float32)
+        if not self.avgdl:
+            return scores
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len / self.avgdl)
+        for term in set(tokenize(query)):
+            tid = self.vocab.get(term)
+            if tid is None:
+                continue
+            start, end = self.offsets[tid], self.offsets[tid + 1]
+            docs, tf = self.post_docs[start:end], self.post_tf[start:end]
+            scores[docs] += self.idf[tid] * tf * (BM25_K1 + 1) / (tf + norm[docs])
+        return scores
+
+    def top_k(self, query, k=10):
+        """Indices of the k best passages with a positive score, best first."""
+        import numpy as np
+        scores = self.scores(query)
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [int(i) for i in best if scores[i] > 0]
+
+def select_passages(index, query, token_budget=DOC_CONTEXT_TOKENS, semantic_ranking=None):
+    """Indices of the most relevant passages that fit in token_budget, in document order.
+
+    A semantic ranking, if given, is fused with BM25 by reciprocal rank.
+    """
+    ranked = index.top_k(query, k=max(1, token_budget // 50))
+    if semantic_ranking:
+        fused = {}
+        for ranking in (ranked, semantic_ranking):
+            for rank, i in enumerate(ranking):
+                fused[i] = fused.get(i, 0.0) + 1.0 / (RRF_K + rank)
+        ranked = sorted(fused, key=lambda i: -fused[i])
+    if not ranked:
+        # Nothing matched (e.g. "summarize this"): fall back to the start of the corpus
+        ranked = range(len(index.passages))
+    chosen, used = [], 0
+    for i in ranked:
+        cost = estimate_tokens(index.passages[i])
+        if used + cost > token_budget and chosen:
+            break
+        chosen.append(i)
+        used += cost
+    return sorted(chosen)
+
+# Passage indexes and extracted texts built this session
+SUPPORTED_DOC_EXTENSIONS = {'.txt', '.pdf', '.docx'}
+_document_indexes = {}   # Tuple of file signatures -> BM25Index over all of them
+_extracted_chunks = {}   # (path, size, mtime) -> (passages, start location of each)
+_document_index_lock = threading.Lock()
+
+def iter_document(doc_path):
+    """Yield (location, text) blocks of a .txt, .pdf or .docx file."""
+    suffix = Path(doc_path).suffix.lower()
+    if suffix == '.txt':
+        return iter_text_file(doc_path)
+    elif suffix == '.pdf':
+        return iter_pdf_pages(doc_path)
+    elif suffix == '.docx':
+        return iter_docx_paragraphs(doc_path)
+    return (block for block in ())
+
+def read_document(doc_path):
+    """Extract the text of a .txt, .pdf or .docx file."""
+    return "".join(text for _, text in iter_document(doc_path))
+
+def extract_document(path):
+    """Process-pool worker: stream one file into (chunks, chunk_locations, page_count)."""
+    pages = 0
+    def counted(blocks):
+        nonlocal pages
+        for location, text in blocks:
+            pages = location
+            yield location, text
+    chunks, locations = [], []
+    for chunk, location in chunk_blocks(counted(iter_document(path))):
+        chunks.append(chunk)
+        locations.append(location)
+    if Path(path).suffix.lower() != '.pdf':
+        pages = 1 if chunks else 0  # Only PDFs have real pages
+    return chunks, locations, pages
+
+def resolve_document_paths(specs):
+    """Expand files, directories and glob patterns into a sorted list of supported files."""
+    if isinstance(specs, (str, Path)):
+        specs = [specs]
+    paths = set()
+    for spec in specs:
+        spec = str(spec)
+        if any(ch in spec for ch in "*?["):
+            matches = [Path(m) for m in glob.glob(os.path.expanduser(spec), recursive=True)]
+        elif Path(spec).is_dir():
+            matches = [p for p in Path(spec).rglob("*")]
+        elif Path(spec).is_file():
+            if Path(spec).suffix.lower() not in SUPPORTED_DOC_EXTENSIONS:
+                console.print(f"[red]Error: Unsupported file extension {Path(spec).suffix}. Supported: .txt, .pdf, .docx[/red]")
+                continue
+            matches = [Path(spec)]
+        else:
+            console.print(f"[red]Error: {spec} is not a valid file, directory or pattern[/red]")
+            continue
+        paths.update(p.resolve() for p in matches if p.is_file() and p.suffix.lower() in SUPPORTED_DOC_EXTENSIONS)
+    return sorted(paths)
+
+# Files each --docs value expanded to, listed once per session; later edits to those files are
+# still seen through their signatures
+_session_document_paths = {}
+
+def session_document_paths(doc_path):
+    """resolve_document_paths(doc_path), walking directories only the first time."""
+    key = tuple(doc_path) if isinstance(doc_path, (list, tuple)) else (doc_path,)
+    paths = _session_document_paths.get(key)
+    if paths is None:
+        paths = resolve_document_paths(doc_path)
+        if paths:
+            _session_document_paths[key] = paths
+    return paths
+
+def document_signature(path):
+    """(path, size, mtime) identifying one version of a file."""
+    stat = path.stat()
+    return (str(path), stat.st_size, stat.st_mtime)
+
+def drawing_allowed():
+    """Only the main thread draws progress bars; a background build must not paint over the prompt."""
+    return threading.current_thread() is threading.main_thread()
+
+def extract_documents(paths):
+    """Extract files in parallel worker processes, reporting throughput in pages/s.
+
+    Returns {path: (chunks, locations, pages)}; files that failed are reported and left out.
+    """
+    from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    results = {}
+    start = time.perf_counter()
+    total_pages = 0
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        TextColumn("{task.completed}/{task.total} files"),
+        transient=True,
+        disable=not drawing_allowed()
+    ) as progress:
+        task = progress.add_task("Extracting documents...", total=len(paths))
+        if len(paths) == 1:
+            # Not worth starting worker processes for a single file
+            try:
+                results[paths[0]] = extract_document(paths[0])
+                total_pages += results[paths[0]][2]
+            except Exception as e:
+                console.print(f"[red]Error reading {paths[0]}: {e}[/red]")
+            progress.update(task, advance=1)
+        else:
+            with ProcessPoolExecutor(max_workers=min(len(paths), os.cpu_count() or 1)) as pool:
+                futures = {pool.submit(extract_document, str(path)): path for path in paths}
+                for future in as_completed(futures):
+                    try:
+                        results[futures[future]] = future.result()
+                        total_pages += results[futures[future]][2]
+                    except Exception as e:
+                        console.print(f"[red]Error reading {futures[future]}: {e}[/red]")
+                    elapsed = time.perf_counter() - start
+                    progress.update(task, advance=1, description=f"Extracting documents ({total_pages / elapsed:.1f} pages/s)...")
+    elapsed = time.perf_counter() - start
+    if elapsed > 0:
+        console.print(f"📄 [green]Extracted {len(paths)} file(s), {total_pages} pages in {elapsed:.1f}s ({total_pages / elapsed:.1f} pages/s)[/green]")
+    return results
+
+# Parsed-document cache: chunks stored by content hash, found via (path, size, mtime)
+DOCUMENT_CACHE_DIR = Path.home() / ".delta" / "cache" / "documents"
+DOCUMENT_CACHE_DB = DOCUMENT_CACHE_DIR / "manifest.sqlite3"
+
+def file_sha256(path):
+    """Hash a file in 1 MB blocks."""
+    import hashlib
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def open_document_cache():
+    """Open (creating if needed) the path -> content hash manifest."""
+    import sqlite3
+    DOCUMENT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(DOCUMENT_CACHE_DB), timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime REAL,
+            sha256 TEXT
+        )
+    """)
+    return conn
+
+def _document_blob(sha256):
+    return DOCUMENT_CACHE_DIR / f"{sha256}.json.z"
+
+def load_cached_document(signature):
+    """Return the cached chunks for a file version, or None if it must be extracted."""
+    path, size, mtime = signature
+    conn = open_document_cache()
     try:
-        doc = Document(file_path)
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text
-    except Exception as e:
-        console.print(f"[red]Error reading {file_path}: {e}[/red]")
-        return ""
+        row = conn.execute("SELECT size, mtime, sha256 FROM files WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == size and row[1] == mtime:
+            sha256 = row[2]
+        else:
+            # Touched, copied or renamed files keep their hash; only edited content re-extracts
+            sha256 = file_sha256(path)
+        blob = _document_blob(sha256)
+        if not blob.exists():
+            return None
+        with open(blob, 'rb') as f:
+            cached = json.loads(zlib.decompress(f.read()))
+        if cached.get("chunking") != [DOC_CHUNK_WORDS, DOC_CHUNK_OVERLAP] or "locations" not in cached:
+            return None
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (path, size, mtime, sha256))
+        return cached["chunks"], cached["locations"]
+    finally:
+        conn.close()
+
+def _forget_document_blob(conn, sha256):
+    """Delete a blob once no manifest row refers to it any more."""
+    if not conn.execute("SELECT 1 FROM files WHERE sha256 = ?", (sha256,)).fetchone():
+        blob = _document_blob(sha256)
+        if blob.exists():
+            blob.unlink()
+
+def store_cached_document(signature, chunks, locations, pages):
+    """Persist a file's chunks and where each one starts under the file's content hash.
+
+    Returns False without storing anything if the file changed since signature was taken.
+    """
+    path, size, mtime = signature
+    sha256 = file_sha256(path)
+    if document_signature(Path(path)) != signature:
+        return False  # Rewritten while we extracted it; these chunks are not for this content
+    value = {"pages": pages, "chunking": [DOC_CHUNK_WORDS, DOC_CHUNK_OVERLAP], "chunks": chunks, "locations": locations}
+    blob = _document_blob(sha256)
+    DOCUMENT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = blob.with_name(blob.name + f".{os.getpid()}.tmp")
+    with open(tmp, 'wb') as f:
+        f.write(zlib.compress(json.dumps(value).encode('utf-8'), 6))
+    os.replace(tmp, blob)
+    conn = open_document_cache()
+    try:
+        with conn:
+            row = conn.execute("SELECT sha256 FROM files WHERE path = ?", (path,)).fetchone()
+            conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (path, size, mtime, sha256))
+            if row and row[0] != sha256:
+                _forget_document_blob(conn, row[0])
+    finally:
+        conn.close()
+    return True
 
-def fetch_document_context(doc_path):
-    """Fetch content from a single document file."""
-    doc_path = Path(doc_path)
-    if not doc_path.is_file():
-        console.print(f"[red]Error: {doc_path} is not a valid file[/red]")
-        return "", [], [], ""
-    
-    supported_extensions = {'.txt', '.pdf', '.docx'}
-    if doc_path.suffix.lower() not in supported_extensions:
-        console.print(f"[red]Error: Unsupported file extension {doc_path.suffix}. Supported: .txt, .pdf, .docx[/red]")
+def forget_cached_documents(paths):
+    """Drop manifest rows for deleted files, and their blobs once nothing else refers to them."""
+    conn = open_document_cache()
+    try:
+        with conn:
+            for path in paths:
+                row = conn.execute("SELECT sha256 FROM files WHERE path = ?", (path,)).fetchone()
+                conn.execute("DELETE FROM files WHERE path = ?", (path,))
+                if row:
+                    _forget_document_blob(conn, row[0])
+    finally:
+        conn.close()
+
+# Folder watching for `delta index watch`
+WATCH_INTERVAL = 2.0  # Seconds between polls
+
+def watch_documents(directory, interval=WATCH_INTERVAL, once=False):
+    """Keep the document cache for directory in step with its files.
+
+    Added or changed files are extracted again and their blobs swapped in with an atomic
+    rename. Running sessions pick the new chunks up on their next question.
+    """
+    directory = Path(directory).expanduser()
+    if not directory.is_dir():
+        console.print(f"[red]Error: {directory} is not a directory[/red]")
+        return
+    if not once:
+        console.print(f"👀 [bold]Watching {directory} every {interval:g}s (Ctrl+C to stop)[/bold]")
+    known = {}
+    first = True
+    try:
+        while True:
+            now = time.time()
+            current = {}
+            for path in resolve_document_paths([directory]):
+                try:
+                    signature = document_signature(path)
+                except OSError:
+                    continue  # Deleted between listing and stat
+                if not once and now - signature[2] < interval:
+                    continue  # Still being written; look again next poll
+                current[str(path)] = signature
+            added = [path for path in current if path not in known]
+            changed = [path for path in current if path in known and current[path] != known[path]]
+            deleted = [path for path in known if path not in current and not Path(path).exists()]
+
+            pending = []
+            for path in added + changed:
+                try:
+                    cached = load_cached_document(current[path])
+                except Exception:
+                    cached = None
+                if cached is None:
+                    pending.append(current[path])
+            if pending:
+                extracted = extract_documents([Path(sig[0]) for sig in pending])
+                for sig in pending:
+                    chunks, locations, pages = extracted.get(Path(sig[0]), ([], [], 0))
+                    if not chunks:
+                        continue
+                    try:
+                        stored = store_cached_document(sig, chunks, locations, pages)
+                    except OSError as e:
+                        console.print(f"[yellow]Could not cache {sig[0]}: {e}[/yellow]")
+                        stored = False
+                    if not stored:
+                        current.pop(sig[0], None)  # Deleted or replaced since extraction; retry next poll
+            if deleted:
+                forget_cached_documents(deleted)
+
+            if first:
+                console.print(f"📚 [green]{len(current)} document(s) indexed, {len(pending)} extracted[/green]")
+            elif added or changed or deleted:
+                stamp = time.strftime("%H:%M:%S")
+                console.print(f"[cyan]{stamp}[/cyan] +{len(added)} added, ~{len(changed)} changed, -{len(deleted)} deleted")
+            known.update(current)
+            for path in deleted:
+                known.pop(path, None)
+            first = False
+            if once:
+                return
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        console.print("👋 [bold green]Stopped watching.[/bold green]")
+
+def build_document_index(paths, wait=True):
+    """Return one passage index over all paths, extracting only new or changed files.
+
+    With wait=False, returns None instead of blocking while another thread is building.
+    """
+    signatures = []
+    for path in paths:
+        try:
+            signatures.append(document_signature(path))
+        except OSError:
+            continue  # Deleted since the session listed it
+    signatures = tuple(signatures)
+    index = _document_indexes.get(signatures)
+    if index is not None:
+        return index  # Built already: no need to queue behind a build of something else
+    if not _document_index_lock.acquire(blocking=wait):
+        return None
+    try:
+        index = _document_indexes.get(signatures)
+        if index is not None:
+            return index
+        stale = [sig for sig in signatures if sig not in _extracted_chunks]
+        if len(stale) < len(signatures):
+            console.print(f"[italic]{len(signatures) - len(stale)} unchanged file(s) reused[/italic]")
+        to_extract = []
+        for sig in stale:
+            try:
+                cached = load_cached_document(sig)
+            except Exception:
+                cached = None  # A broken cache just means extracting again
+            if cached is None:
+                to_extract.append(sig)
+            else:
+                _extracted_chunks[sig] = tuple(cached)
+        if len(to_extract) < len(stale):
+            console.print(f"[italic]{len(stale) - len(to_extract)} file(s) loaded from the document cache[/italic]")
+        failed = False
+        if to_extract:
+            extracted = extract_documents([Path(sig[0]) for sig in to_extract])
+            for sig in to_extract:
+                if Path(sig[0]) not in extracted:
+                    failed = True  # Not remembered, so the next question tries the file again
+                    continue
+                chunks, locations, pages = extracted[Path(sig[0])]
+                _extracted_chunks[sig] = (chunks, locations)
+                if chunks:
+                    try:
+                        store_cached_document(sig, chunks, locations, pages)
+                    except Exception as e:
+                        console.print(f"[yellow]Could not cache {sig[0]}: {e}[/yellow]")
+        passages, sources, locations = [], [], []
+        for sig in signatures:
+            chunks, chunk_locations = _extracted_chunks.get(sig, ([], []))
+            passages.extend(chunks)
+            sources.extend([sig[0]] * len(chunks))
+            locations.extend(chunk_locations)
+        index = BM25Index(passages, sources, locations)
+        # Only the current corpus is worth keeping in memory; swap it in whole
+        _document_indexes.clear()
+        if not failed:
+            _document_indexes[signatures] = index
+        for sig in [sig for sig in _extracted_chunks if sig not in signatures]:
+            del _extracted_chunks[sig]
+        return index
+    finally:
+        _document_index_lock.release()
+
+# Semantic passage index from local Ollama embeddings
+EMBED_MODEL = "nomic-embed-text"  # Default for --embed
+EMBED_BATCH_SIZE = 32             # Passages per embedding request
+VECTOR_INDEX_DIR = Path.home() / ".delta" / "cache" / "vectors"
+VECTOR_SEARCH_BLOCK = 65536       # Rows scored at a time, so queries never load the whole matrix
+RRF_K = 60                        # Reciprocal rank fusion constant for hybrid ranking
+VECTOR_STORE_DB = "embeddings.sqlite3"
+VECTOR_ROW_TTL = 7 * 24 * 3600    # Seconds an embedding is kept after the last build that used it
+
+def embed_texts(model, texts):
+    """Embed texts with Ollama (a pooled host when hosts.toml exists) and L2-normalise them (float32 array)."""
+    import numpy as np
+    pool = get_host_pool()
+    if pool is not None:
+        response = pool.request(model, 'embed', input=list(texts))
+    else:
+        response = get_ollama_client().embed(model=model, input=list(texts))
+    vectors = np.asarray(response['embeddings'], dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+class VectorIndex:
+    """Cosine top-k over passage embeddings kept in an on-disk float16 memmap.
+
+    Each embedding model gets one store holding vectors.f16 and an SQLite table mapping a
+    passage's content hash to its row. Unchanged passages keep their rows across edits and
+    builds, so only new text is embedded; rows no build has used for VECTOR_ROW_TTL are
+    recycled.
+    """
+
+    def __init__(self, directory, model):
+        self.directory = directory
+        self.model = model
+        self.vectors_file = directory / "vectors.f16"
+        self.dim = 0
+        self.capacity = 0
+        self.rows = None  # Store row of each passage, in BM25Index order
+
+    def _connect(self):
+        import sqlite3
+        self.directory.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.directory / VECTOR_STORE_DB), timeout=30)
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS rows (chunk TEXT PRIMARY KEY, row INTEGER UNIQUE, used_at REAL);
+        """)
+        return conn
+
+    def _load_meta(self, conn):
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        self.dim = int(meta.get("dim", 0))
+        self.capacity = int(meta.get("capacity", 0))
+
+    def _grow(self, conn, needed):
+        """Extend vectors.f16 to hold at least needed rows."""
+        capacity = max(needed, 2 * self.capacity, EMBED_BATCH_SIZE)
+        with open(self.vectors_file, 'ab') as f:
+            f.truncate(capacity * self.dim * 2)  # float16: 2 bytes per value, new rows zero-filled
+        self.capacity = capacity
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('capacity', ?)", (str(capacity),))
+
+    @staticmethod
+    def remove_unused_stores(keep):
+        """Delete stores of the old per-corpus layout and stores no build has used for VECTOR_ROW_TTL."""
+        if not VECTOR_INDEX_DIR.exists():
+            return
+        cutoff = time.time() - VECTOR_ROW_TTL
+        for directory in VECTOR_INDEX_DIR.iterdir():
+            if directory == keep or not directory.is_dir():
+                continue
+            db = directory / VECTOR_STORE_DB
+            if not db.exists() or db.stat().st_mtime < cutoff:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    @classmethod
+    def build(cls, index, model, batch_size=EMBED_BATCH_SIZE):
+        """Embed the passages of a BM25Index that the model's store has not seen yet."""
+        import hashlib
+        import numpy as np
+        from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn
+
+        directory = VECTOR_INDEX_DIR / hashlib.sha256(model.encode('utf-8')).hexdigest()[:32]
+        cls.remove_unused_stores(keep=directory)
+        vector_index = cls(directory, model)
+        hashes = [hashlib.sha256(passage.encode('utf-8')).hexdigest() for passage in index.passages]
+        with file_lock(directory / ".lock"):
+            conn = vector_index._connect()
+            try:
+                vector_index._load_meta(conn)
+                now = time.time()
+                with conn:
+                    conn.execute("INSERT OR REPLACE INTO meta VALUES ('model', ?)", (model,))
+                    conn.executemany("UPDATE rows SET used_at = ? WHERE chunk = ?", ((now, h) for h in set(hashes)))
+                    conn.execute("DELETE FROM rows WHERE used_at < ?", (now - VECTOR_ROW_TTL,))
+                known = dict(conn.execute("SELECT chunk, row FROM rows"))
+                missing = {}  # Content hash -> first passage with that text
+                for i, h in enumerate(hashes):
+                    if h not in known:
+                        missing.setdefault(h, i)
+                if missing:
+                    if len(missing) < len(set(hashes)):
+                        console.print(f"[italic]{len(set(hashes)) - len(missing)} embedded passage(s) reused[/italic]")
+                    taken = set(known.values())
+                    free = [row for row in range(vector_index.capacity) if row not in taken]
+                    todo = list(missing.items())
+                    matrix = None
+                    with Progress(
+                        SpinnerColumn(),
+                        TextColumn("[progress.description]{task.description}"),
+                        BarColumn(),
+                        TextColumn("{task.completed}/{task.total} passages"),
+                        transient=True,
+                        disable=not drawing_allowed()
+                    ) as progress:
+                        task = progress.add_task(f"Embedding with {model}...", total=len(todo))
+                        for start in range(0, len(todo), batch_size):
+                            batch = todo[start:start + batch_size]
+                            vectors = embed_texts(model, [index.passages[i] for _, i in batch])
+                            if not vector_index.dim:
+                                vector_index.dim = vectors.shape[1]
+                                with conn:
+                                    conn.execute("INSERT OR REPLACE INTO meta VALUES ('dim', ?)", (str(vector_index.dim),))
+                            if len(free) < len(batch):
+                                needed = vector_index.capacity + len(batch) - len(free)
+                                old_capacity = vector_index.capacity
+                                vector_index._grow(conn, needed)
+                                free.extend(range(old_capacity, vector_index.capacity))
+                                matrix = None  # Remap at the new size
+                            if matrix is None:
+                                matrix = np.memmap(vector_index.vectors_file, dtype=np.float16, mode='r+',
+                                                   shape=(vector_index.capacity, vector_index.dim))
+                            rows, free = free[:len(batch)], free[len(batch):]
+                            matrix[rows] = vectors.astype(np.float16)
+                            matrix.flush()
+                            # Rows are claimed only after they are on disk, so a crash loses at most one batch
+                            with conn:
+                                conn.executemany("INSERT OR REPLACE INTO rows VALUES (?, ?, ?)",
+                                                 ((h, row, now) for (h, _), row in zip(batch, rows)))
+                            known.update((h, row) for (h, _), row in zip(batch, rows))
+                            progress.update(task, completed=start + len(batch))
+                    del matrix
+            finally:
+                conn.close()
+        vector_index.rows = np.array([known[h] for h in hashes], dtype=np.int64)
+        return vector_index
+
+    def search(self, query, k=10):
+        """Passage ids ranked by cosine similarity to query, best first."""
+        import numpy as np
+        if self.rows is None or not len(self.rows) or not self.dim:
+            return []
+        q = embed_texts(self.model, [query])[0]
+        matrix = np.memmap(self.vectors_file, dtype=np.float16, mode='r', shape=(self.capacity, self.dim))
+        best_ids = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, len(self.rows), VECTOR_SEARCH_BLOCK):
+            block = np.asarray(matrix[self.rows[start:start + VECTOR_SEARCH_BLOCK]], dtype=np.float32)
+            scores = block @ q
+            take = min(k, len(scores))
+            top = np.argpartition(-scores, take - 1)[:take]
+            best_ids = np.concatenate((best_ids, top + start))
+            best_scores = np.concatenate((best_scores, scores[top]))
+            if len(best_ids) > k:
+                keep = np.argpartition(-best_scores, k - 1)[:k]
+                best_ids, best_scores = best_ids[keep], best_scores[keep]
+        order = np.argsort(-best_scores, kind='stable')
+        return [int(i) for i in best_ids[order]]
+
+# Vector index for the current corpus: model -> (BM25Index it was built from, VectorIndex)
+_vector_indexes = {}
+_vector_index_lock = threading.Lock()
+
+def get_vector_index(index, model, wait=True):
+    """Return the vector index for index, building it on first use.
+
+    With wait=False, returns None instead of blocking while another thread is building.
+    """
+    cached = _vector_indexes.get(model)
+    if cached and cached[0] is index:
+        return cached[1]
+    if not _vector_index_lock.acquire(blocking=wait):
+        return None
+    try:
+        cached = _vector_indexes.get(model)
+        if cached and cached[0] is index:
+            return cached[1]
+        try:
+            vector_index = VectorIndex.build(index, model)
+        except Exception as e:
+            console.print(f"[yellow]Semantic index unavailable ({e}); try 'delta pull {model}'. Using keyword search only.[/yellow]")
+            vector_index = None
+        _vector_indexes[model] = (index, vector_index)
+        return vector_index
+    finally:
+        _vector_index_lock.release()
+
+def location_label(source, location):
+    """Human-readable position of a passage: a page for PDFs, a paragraph or line otherwise."""
+    if location is None:
+        return ""
+    suffix = Path(source).suffix.lower()
+    if suffix == '.pdf':
+        return f" (p. {location})"
+    if suffix == '.docx':
+        return f" (¶ {location})"
+    return f" (line {location})"
+
+def scan_documents(paths, query, token_budget=DOC_CONTEXT_TOKENS):
+    """Stream documents without indexing them, stopping once enough matching text is found.
+
+    Keeps only the best few passages in memory. Returns (passage, source, location) tuples.
+    """
+    import heapq
+    terms = set(preprocess_query(query).split())
+    keep = max(1, token_budget // 50)
+    best = []  # Min-heap of (score, order, passage, source, location)
+    order = 0
+    complete_tokens = 0
+    for path in paths:
+        blocks = iter_document(path)
+        try:
+            for chunk, location in chunk_blocks(blocks):
+                order += 1
+                score = len(terms & set(tokenize(chunk))) if terms else 0
+                if terms and not score:
+                    continue
+                item = (score, -order, chunk, str(path), location)
+                if len(best) < keep:
+                    heapq.heappush(best, item)
+                else:
+                    heapq.heappushpop(best, item)
+                if score == len(terms):
+                    complete_tokens += estimate_tokens(chunk)
+                    if complete_tokens >= token_budget:
+                        return [item[2:] for item in sorted(best, reverse=True)]
+        except Exception as e:
+            console.print(f"[red]Error reading {path}: {e}[/red]")  # Skip it; the other files still count
+        finally:
+            blocks.close()  # Stops the reader from parsing further pages
+    return [item[2:] for item in sorted(best, reverse=True)]
+
+def fetch_document_context(doc_path, query="", embed_model=None):
+    """Fetch the passages most relevant to query from a file, directory or glob of documents."""
+    paths = session_document_paths(doc_path)
+    if not paths:
+        console.print(f"[red]Error: no .txt, .pdf or .docx files found for {doc_path}[/red]")
         return "", [], [], ""
-    
-    content = ""
-    try:
-        if doc_path.suffix.lower() == '.txt':
-            content = read_text_file(doc_path)
-        elif doc_path.suffix.lower() == '.pdf':
-            content = read_pdf_file(doc_path)
-        elif doc_path.suffix.lower() == '.docx':
-            content = read_docx_file(doc_path)
+
+    try:
+        index = build_document_index(paths, wait=not query)
     except Exception as e:
         console.print(f"[red]Error reading {doc_path}: {e}[/red]")
         return "", [], [], ""
-    
-    if content:
-        context = f"Document: {doc_path.name}\n{content[:500]}...\n" if len(content) > 500 else f"Document: {doc_path.name}\n{content}\n"
-        citations = [str(doc_path)]
-        return context, citations, [], ""
+
+    if index is None:
+        # The index is still being built: stream the files instead of waiting for it
+        selected, used = [], 0
+        for passage, source, location in scan_documents(paths, query):
+            cost = estimate_tokens(passage)
+            if used + cost > DOC_CONTEXT_TOKENS and selected:
+                break
+            selected.append((passage, source, location))
+            used += cost
     else:
-        console.print(f"[yellow]No content found in {doc_path}[/yellow]")
+        if not index.passages:
+            console.print(f"[yellow]No content found in {doc_path}[/yellow]")
+            return "", [], [], ""
+        semantic_ranking = None
+        if embed_model and query:
+            vector_index = get_vector_index(index, embed_model, wait=False)  # Keyword search until it is ready
+            if vector_index is not None:
+                try:
+                    semantic_ranking = vector_index.search(query, k=max(1, DOC_CONTEXT_TOKENS // 50))
+                except Exception as e:
+                    console.print(f"[yellow]Semantic search failed ({e}); using keyword search only.[/yellow]")
+        elif embed_model:
+            get_vector_index(index, embed_model)  # Session warm-up: build or resume the index now
+        chosen = select_passages(index, query, semantic_ranking=semantic_ranking)
+        selected = [(index.passages[i], index.sources[i], index.locations[i]) for i in chosen]
+
+    if not selected:
         return "", [], [], ""
-
-def get_context(query, use_wiki=False, use_arxiv=False, use_ddg=False, doc_path=None):
-    """Fetch context based on flags or document file path."""
+    parts, citations = [], []
+    for passage, source, location in selected:
+        label = location_label(source, location)
+        parts.append(f"Document: {Path(source).name}{label}\n{passage}")
+        if source + label not in citations:
+            citations.append(source + label)
+    context = "\n...\n".join(parts) + "\n"
+    return context, citations, [], ""
+
+# Multi-source retrieval
+CONTEXT_TIMEOUT = 10.0  # Seconds to wait for sources before answering with what has arrived
+SOURCE_PRIORITY = ["docs", "wiki", "arxiv", "ddg"]  # Tie-break order when relevance is equal
+
+def parse_duration(value):
+    """Parse a duration such as '1.5', '1.5s' or '500ms' into seconds."""
+    text = str(value).strip().lower()
+    try:
+        if text.endswith("ms"):
+            seconds = float(text[:-2]) / 1000
+        elif text.endswith("s"):
+            seconds = float(text[:-1])
+        else:
+            seconds = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid duration '{value}', expected e.g. 1.5s or 500ms")
+    if seconds <= 0:
+        raise argparse.ArgumentTypeError("duration must be positive")
+    return seconds
+
+def relevance_score(query, text):
+    """Fraction of the query's content words that appear in text."""
+    terms = set(preprocess_query(query).split())
+    if not terms:
+        return 0.0
+    words = set(re.findall(r'\w+', text.lower()))
+    return len(terms & words) / len(terms)
+
+def merge_contexts(query, results):
+    """Rank (source, result) pairs by relevance and merge them into a single context tuple."""
+    ranked = sorted(
+        results,
+        key=lambda item: (-relevance_score(query, item[1][0]), SOURCE_PRIORITY.index(item[0]))
+    )
+    context_parts, citations, images, url = [], [], [], ""
+    for source, (context, source_citations, source_images, source_url) in ranked:
+        context_parts.append(f"[{source}]\n{context.strip()}" if len(ranked) > 1 else context)
+        citations.extend(c for c in source_citations if c not in citations)
+        images.extend(source_images)
+        url = url or source_url
+    return "\n\n".join(context_parts), citations, images, url
+
+def get_context(query, use_wiki=False, use_arxiv=False, use_ddg=False, doc_path=None, timeout=CONTEXT_TIMEOUT, embed_model=None):
+    """Query every selected source concurrently and merge whatever arrives within timeout."""
+    from concurrent.futures import wait
+
+    sources = []
     if doc_path:
-        return fetch_document_context(doc_path)
+        sources.append(("docs", lambda: fetch_document_context(doc_path, query, embed_model)))
     if use_wiki:
-        return fetch_wikipedia_context(query)
+        sources.append(("wiki", lambda: fetch_wikipedia_context(query)))
     if use_arxiv:
-        return fetch_arxiv_context(query)
+        sources.append(("arxiv", lambda: fetch_arxiv_context(query)))
     if use_ddg:
-        return fetch_duckduckgo_context(query)
-    return "", [], [], ""
+        sources.append(("ddg", lambda: fetch_duckduckgo_context(query)))
+    if not sources:
+        return "", [], [], ""
+
+    # Late sources keep running in the background and land in the retrieval cache for next time,
+    # unless Delta exits first
+    futures = {submit_daemon(fetch, f"delta-{source}"): source for source, fetch in sources}
+    done, pending = wait(futures, timeout=timeout)
+
+    for future in pending:
+        console.print(f"⏱️ [yellow]{futures[future]} did not answer within {timeout:.1f}s, continuing without it[/yellow]")
+    results = []
+    for future in done:
+        try:
+            result = future.result()
+        except Exception as e:
+            console.print(f"❌ [red]{futures[future]} Error: {str(e)}[/red]")
+            continue
+        if result[0]:
+            results.append((futures[future], result))
+    if not results:
+        return "", [], [], ""
+    return merge_contexts(query, results)
+
+# Per-turn metrics
+METRICS_SINKS = []  # Callables receiving one dict per event
+
+def add_jsonl_metrics_sink(path):
+    """Append every metrics event to path as one JSON line."""
+    path = Path(path).expanduser()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lock = threading.Lock()
+    def sink(event):
+        with lock, open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(event) + "\n")
+    METRICS_SINKS.append(sink)
+
+def emit_metrics(kind, **fields):
+    """Send a metrics event to every registered sink; sinks never break the caller."""
+    if not METRICS_SINKS:
+        return
+    event = {"ts": time.time(), "kind": kind, **fields}
+    for sink in METRICS_SINKS:
+        try:
+            sink(event)
+        except Exception:
+            pass
+
+def generation_metrics(final_chunk, request_start, first_token_at, end):
+    """Latency and throughput of one request from Ollama's counters plus client-side timing."""
+    def seconds(name):
+        return (final_chunk.get(name) or 0) / 1e9 if final_chunk else 0.0
+    prompt_tokens = (final_chunk.get('prompt_eval_count') or 0) if final_chunk else 0
+    eval_tokens = (final_chunk.get('eval_count') or 0) if final_chunk else 0
+    prefill, decode = seconds('prompt_eval_duration'), seconds('eval_duration')
+    return {
+        "ttft_s": (first_token_at - request_start) if first_token_at else None,
+        "load_s": seconds('load_duration'),
+        "prompt_tokens": prompt_tokens,
+        "prefill_s": prefill,
+        "prefill_tok_s": prompt_tokens / prefill if prefill else None,
+        "eval_tokens": eval_tokens,
+        "decode_s": decode,
+        "decode_tok_s": eval_tokens / decode if decode else None,
+        "total_s": end - request_start,
+    }
+
+def format_metrics(metrics):
+    """One compact line for the console."""
+    parts = []
+    if metrics["ttft_s"] is not None:
+        parts.append(f"TTFT {metrics['ttft_s']:.2f}s")
+    if metrics["prefill_tok_s"]:
+        parts.append(f"prefill {metrics['prefill_tok_s']:.0f} tok/s ({metrics['prompt_tokens']} tok)")
+    if metrics["decode_tok_s"]:
+        parts.append(f"decode {metrics['decode_tok_s']:.1f} tok/s ({metrics['eval_tokens']} tok)")
+    if metrics["load_s"] >= 0.05:
+        parts.append(f"load {metrics['load_s']:.2f}s")
+    parts.append(f"total {metrics['total_s']:.2f}s")
+    return " · ".join(parts)
+
+# Conversation window sent to the model each turn
+NUM_CTX = 2048           # Context window requested from Ollama
+ANSWER_RESERVE = 512     # Tokens kept free for the model's answer
+SUMMARY_TOKENS = 256     # Cap on the rolling summary of turns that left the window
+PROMPT_OVERHEAD = 32     # Chat template and prompt scaffolding per request
+
+def trim_to_tokens(text, max_tokens):
+    """Cut text down to roughly max_tokens, keeping the beginning."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    return " ".join(words[:max(0, int(max_tokens / 1.3))]) + " ..."
+
+class ConversationWindow:
+    """Token-budgeted chat history: recent turns verbatim, older ones as a rolling summary.
+
+    Past turns keep only the bare question, so context retrieved for an earlier question is
+    never sent again.
+    """
+
+    def __init__(self, num_ctx=NUM_CTX, reserve=ANSWER_RESERVE):
+        self.budget = max(256, num_ctx - reserve)
+        self.turns = []          # (question, answer) pairs still sent verbatim
+        self.summary_lines = []  # One line per turn folded out of the window
+        self.last_request_tokens = 0
+
+    def summary(self):
+        if not self.summary_lines:
+            return ""
+        return "Summary of the earlier conversation:\n" + "\n".join(self.summary_lines)
+
+    def available_tokens(self, question, wanted=0):
+        """Tokens left for retrieved context once the question and summary are counted.
+
+        Turns that would not fit beside the question and wanted tokens of context are folded
+        first, so the allowance is measured against the summary messages_for() will send.
+        """
+        while self.turns and self._cost(question) + wanted > self.budget:
+            self._fold(*self.turns.pop(0))
+        summary = self.summary()
+        used = estimate_tokens(question) + PROMPT_OVERHEAD + (estimate_tokens(summary) if summary else 0)
+        return max(0, self.budget - used)
+
+    def prompt_for(self, question, context=""):
+        """build_prompt() for question, with context cut to what fits beside the summary and question."""
+        if not context:
+            return build_prompt(question)
+        allowance = self.available_tokens(question, estimate_tokens(context))
+        while True:
+            prompt = build_prompt(question, trim_to_tokens(context, allowance))
+            over = self._cost(prompt) - self.budget
+            if over <= 0 or self.turns or not allowance:
+                return prompt  # Turns still in the window are folded by messages_for()
+            allowance = max(0, allowance - over)  # Prompt scaffolding the estimate didn't count
+
+    def _cost(self, prompt):
+        summary = self.summary()
+        cost = estimate_tokens(prompt) + PROMPT_OVERHEAD + (estimate_tokens(summary) if summary else 0)
+        return cost + sum(estimate_tokens(q) + estimate_tokens(a) for q, a in self.turns)
+
+    def _fold(self, question, answer):
+        question = trim_to_tokens(" ".join(question.split()), 40)
+        answer = trim_to_tokens(first_sentences(answer, 1), 50)
+        self.summary_lines.append(f"- Asked: {question} Answered: {answer}")
+        while len(self.summary_lines) > 1 and estimate_tokens(self.summary()) > SUMMARY_TOKENS:
+            self.summary_lines.pop(0)
+
+    def messages_for(self, prompt):
+        """Messages for this request: summary, as many recent turns as fit, then prompt."""
+        while self.turns and self._cost(prompt) > self.budget:
+            self._fold(*self.turns.pop(0))
+        while self.summary_lines and self._cost(prompt) > self.budget:
+            self.summary_lines.pop(0)  # Folding grew the summary past what is left; drop its oldest lines
+        messages = []
+        summary = self.summary()
+        if summary:
+            messages.append({'role': 'system', 'content': summary})
+        for question, answer in self.turns:
+            messages.append({'role': 'user', 'content': question})
+            messages.append({'role': 'assistant', 'content': answer})
+        messages.append({'role': 'user', 'content': prompt})
+        self.last_request_tokens = self._cost(prompt)
+        return messages
+
+    def add_turn(self, question, answer):
+        self.turns.append((question, answer))
+
+# Shared Ollama client
+OLLAMA_CONNECT_TIMEOUT = 5.0    # Seconds to establish a connection
+OLLAMA_READ_TIMEOUT = 300.0     # Seconds to wait for the next bytes (covers loading a large model)
+OLLAMA_RETRIES = 2              # Extra attempts after a transient failure
+OLLAMA_RETRY_BACKOFF = 0.5      # Base delay; doubles per attempt, with full jitter
+OLLAMA_KEEPALIVE_EXPIRY = 120.0 # Seconds an idle pooled connection stays open between turns
+
+class OllamaClient:
+    """ollama.Client with pooled keep-alive connections, connect/read timeouts, bounded retries
+    and per-request latency metrics.
+
+    Failures where the request never reached the server (connection refused, connect timeout)
+    are retried for every call. Dropped or timed-out responses and 429/5xx errors are retried only
+    for idempotent calls. Streams are retried only before their first chunk.
+    """
+
+    IDEMPOTENT = {"list", "show", "ps", "embed"}
+
+    def __init__(self, host=None, connect_timeout=OLLAMA_CONNECT_TIMEOUT, read_timeout=OLLAMA_READ_TIMEOUT, retries=OLLAMA_RETRIES):
+        import httpx
+        import ollama
+        self.host = host or os.environ.get("OLLAMA_HOST") or "127.0.0.1:11434"
+        self.retries = retries
+        self._settings = {
+            "host": host,
+            "timeout": httpx.Timeout(read_timeout, connect=connect_timeout),
+            "limits": httpx.Limits(max_keepalive_connections=BATCH_CONCURRENCY * 2, keepalive_expiry=OLLAMA_KEEPALIVE_EXPIRY),
+        }
+        self._client = ollama.Client(**self._settings)
+        self._async_client = None
+        self._async_loop = None
+
+    def chat(self, **kwargs):
+        return self._call("chat", **kwargs)
+
+    def generate(self, **kwargs):
+        return self._call("generate", **kwargs)
+
+    def embed(self, **kwargs):
+        return self._call("embed", **kwargs)
+
+    def list(self):
+        return self._call("list")
+
+    def pull(self, model, **kwargs):
+        return self._call("pull", model, **kwargs)
+
+    def delete(self, model):
+        return self._call("delete", model)
+
+    def _retryable(self, method, error):
+        import httpx
+        import ollama
+        if isinstance(error, (ConnectionError, httpx.ConnectError, httpx.ConnectTimeout)):
+            return True  # Nothing reached the server
+        if method not in self.IDEMPOTENT:
+            return False
+        if isinstance(error, ollama.ResponseError):
+            return error.status_code in (429, 500, 502, 503, 504)
+        return isinstance(error, httpx.TransportError)
+
+    def _backoff(self, attempt):
+        return random.uniform(0, OLLAMA_RETRY_BACKOFF * 2 ** (attempt - 1))
+
+    def _record(self, method, start, attempt, first_chunk_at=None, error=None):
+        if error is not None:
+            error = f"{type(error).__name__}: {error}" if str(error) else type(error).__name__
+        emit_metrics(
+            "ollama_request", method=method, host=self.host, attempt=attempt,
+            latency_s=time.perf_counter() - start,
+            first_chunk_s=(first_chunk_at - start) if first_chunk_at else None,
+            error=error,
+        )
+
+    def _call(self, method, *args, **kwargs):
+        if kwargs.get("stream"):
+            return self._stream(method, *args, **kwargs)
+        for attempt in itertools.count(1):
+            start = time.perf_counter()
+            try:
+                response = getattr(self._client, method)(*args, **kwargs)
+            except Exception as e:
+                self._record(method, start, attempt, error=e)
+                if attempt > self.retries or not self._retryable(method, e):
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+            self._record(method, start, attempt)
+            return response
+
+    def _stream(self, method, *args, **kwargs):
+        for attempt in itertools.count(1):
+            start = time.perf_counter()
+            first_chunk_at = None
+            try:
+                for chunk in getattr(self._client, method)(*args, **kwargs):
+                    if first_chunk_at is None:
+                        first_chunk_at = time.perf_counter()
+                    yield chunk
+            except Exception as e:
+                self._record(method, start, attempt, first_chunk_at, error=e)
+                if first_chunk_at is not None or attempt > self.retries or not self._retryable(method, e):
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+            self._record(method, start, attempt, first_chunk_at)
+            return
+
+    def _get_async_client(self):
+        """ollama.AsyncClient for the running event loop (its connection pool belongs to one loop)."""
+        import asyncio
+        import ollama
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            self._async_client = ollama.AsyncClient(**self._settings)
+            self._async_loop = loop
+        return self._async_client
+
+    async def astream(self, method, **kwargs):
+        """Streaming call on ollama.AsyncClient, with the same retries and metrics as the sync calls.
+
+        Cancelling the consuming task closes the HTTP stream, and Ollama stops generating.
+        """
+        import asyncio
+        for attempt in itertools.count(1):
+            start = time.perf_counter()
+            first_chunk_at = None
+            try:
+                async for chunk in await getattr(self._get_async_client(), method)(stream=True, **kwargs):
+                    if first_chunk_at is None:
+                        first_chunk_at = time.perf_counter()
+                    yield chunk
+            except asyncio.CancelledError as e:
+                self._record(method, start, attempt, first_chunk_at, error=e)
+                raise
+            except Exception as e:
+                self._record(method, start, attempt, first_chunk_at, error=e)
+                if first_chunk_at is not None or attempt > self.retries or not self._retryable(method, e):
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            self._record(method, start, attempt, first_chunk_at)
+            return
+
+_ollama_client = None
+_ollama_client_settings = {}
+_ollama_client_lock = threading.Lock()
+
+def configure_ollama_client(**settings):
+    """Set host/timeouts/retries for the shared client; it is created on first use."""
+    global _ollama_client
+    with _ollama_client_lock:
+        _ollama_client_settings.update({key: value for key, value in settings.items() if value is not None})
+        _ollama_client = None
+
+def get_ollama_client():
+    """The client every command uses for the local (or OLLAMA_HOST) server."""
+    global _ollama_client
+    with _ollama_client_lock:
+        if _ollama_client is None:
+            _ollama_client = OllamaClient(**_ollama_client_settings)
+        return _ollama_client
+
+# Host pool: spread requests over several Ollama servers on the LAN
+HOSTS_FILE = Path.home() / ".delta" / "hosts.toml"
+HOST_TIMEOUT = 300.0          # Seconds a request may take before the host counts as failed
+HOST_HEALTH_TIMEOUT = 2.0     # Seconds a health check may take
+HOST_RECHECK_INTERVAL = 30.0  # Seconds before a host's health and model inventory are checked again
+
+class NoHostAvailable(RuntimeError):
+    """No healthy host in the pool has the requested model."""
+
+class Host:
+    """One Ollama server in the pool, with its model inventory and usage counters."""
+
+    def __init__(self, name, url, parallel=1):
+        self.name = name
+        self.url = url
+        self.parallel = max(1, parallel)  # Requests the server runs at once (OLLAMA_NUM_PARALLEL)
+        # No client-side retries: failing over to another host is the pool's retry
+        self.client = OllamaClient(url, read_timeout=HOST_TIMEOUT, retries=0)
+        self._health_client = OllamaClient(url, connect_timeout=HOST_HEALTH_TIMEOUT, read_timeout=HOST_HEALTH_TIMEOUT, retries=0)
+        self.inventory = {}
+        self.healthy = False
+        self.checked_at = None
+        self.latency = None
+        self.in_flight = 0
+        self.stats = {"requests": 0, "failures": 0, "prompt_tokens": 0, "eval_tokens": 0, "eval_s": 0.0, "busy_s": 0.0}
+
+    def check(self):
+        """Refresh health and model inventory with one /api/tags call."""
+        start = time.perf_counter()
+        try:
+            models = self._health_client.list().get('models', [])
+        except Exception:
+            self.healthy = False
+        else:
+            self.healthy = True
+            self.latency = time.perf_counter() - start
+            self.inventory = {model.get('model'): model for model in models}
+        self.checked_at = time.monotonic()
+        return self.healthy
+
+    def has_model(self, model_name):
+        return model_name in self.inventory or f"{model_name}:latest" in self.inventory
+
+class HostPool:
+    """Ollama servers from hosts.toml. Each request goes to the least-loaded healthy host that
+    has the model, and moves to the next one if that host fails."""
+
+    def __init__(self, hosts):
+        self.hosts = hosts
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path=HOSTS_FILE):
+        """Pool described by hosts.toml, or None if the file doesn't exist.
+
+        [[hosts]]
+        name = "desk"
+        url = "http://192.168.1.20:11434"
+        parallel = 2
+        """
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            import tomli as tomllib
+        with open(path, 'rb') as f:
+            config = tomllib.load(f)
+        hosts = []
+        for entry in config.get("hosts", []):
+            if not entry.get("url"):
+                raise ValueError(f"{path}: every [[hosts]] entry needs a url")
+            hosts.append(Host(entry.get("name") or entry["url"], entry["url"], int(entry.get("parallel", 1))))
+        if not hosts:
+            raise ValueError(f"{path} defines no [[hosts]]")
+        return cls(hosts)
+
+    def check(self, force=False):
+        """Health-check new hosts, and any host last checked HOST_RECHECK_INTERVAL ago, in parallel.
+
+        Rechecking healthy hosts too keeps their inventories current, so a model pulled on a host
+        outside Delta starts being routed to.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        now = time.monotonic()
+        due = [host for host in self.hosts if force or host.checked_at is None
+               or now - host.checked_at >= HOST_RECHECK_INTERVAL]
+        if due:
+            with ThreadPoolExecutor(max_workers=len(due)) as executor:
+                list(executor.map(Host.check, due))
+        return [host for host in self.hosts if host.healthy]
+
+    def has_model(self, model_name):
+        return any(host.has_model(model_name) for host in self.check())
+
+    def installed_models(self):
+        """Every model on every healthy host, tagged with the host name."""
+        return [{**dict(model), 'host': host.name} for host in self.check() for model in host.inventory.values()]
+
+    @contextmanager
+    def acquire(self, model_name, exclude=(), check=True):
+        """Reserve the least-loaded healthy host with the model for the duration of the block.
+
+        check=False skips the health check, for callers that already ran it off the event loop.
+        """
+        if check:
+            self.check()
+        with self._lock:
+            candidates = [host for host in self.hosts if host.healthy and host.has_model(model_name) and host not in exclude]
+            if not candidates:
+                raise NoHostAvailable(f"No healthy host has {model_name} (run 'delta hosts' to check)")
+            host = min(candidates, key=lambda h: (h.in_flight / h.parallel, h.latency or 0))
+            host.in_flight += 1
+        start = time.perf_counter()
+        try:
+            yield host
+        finally:
+            with self._lock:
+                host.in_flight -= 1
+                host.stats["busy_s"] += time.perf_counter() - start
+
+    def _record(self, host, response):
+        with self._lock:
+            host.stats["requests"] += 1
+            host.stats["prompt_tokens"] += response.get('prompt_eval_count') or 0
+            host.stats["eval_tokens"] += response.get('eval_count') or 0
+            host.stats["eval_s"] += (response.get('eval_duration') or 0) / 1e9
+
+    def _host_failed(self, host, error):
+        """Take a host out of rotation if error means the host (not the request) is broken."""
+        import ollama
+        if isinstance(error, ollama.ResponseError) and error.status_code < 500:
+            return False  # e.g. model not found: another host won't do better
+        with self._lock:
+            host.healthy = False
+            host.checked_at = time.monotonic()
+            host.stats["failures"] += 1
+        console.print(f"[yellow]⚠️ Host {host.name} failed ({error}); failing over[/yellow]")
+        return True
+
+    def request(self, model_name, method, **kwargs):
+        """Call client.<method> (chat, generate, embed) on a pooled host and return the response."""
+        tried = []
+        while True:
+            with self.acquire(model_name, exclude=tried) as host:
+                try:
+                    response = getattr(host.client, method)(model=model_name, **kwargs)
+                except Exception as e:
+                    if not self._host_failed(host, e):
+                        raise
+                    tried.append(host)
+                    continue
+                self._record(host, response)
+                return response
+
+    async def astream(self, model_name, method, **kwargs):
+        """Async streaming version of request(). If a host dies mid-answer the request restarts on
+        another host, after a {'failover': host_name} chunk telling the caller to discard the partial text."""
+        import asyncio
+        loop = asyncio.get_running_loop()
+        tried = []
+        while True:
+            started = False
+            # Health checks block on the network; keep them off the loop so Esc still cancels
+            await loop.run_in_executor(None, self.check)
+            with self.acquire(model_name, exclude=tried, check=False) as host:
+                try:
+                    async for chunk in host.client.astream(method, model=model_name, **kwargs):
+                        started = True
+                        if chunk.get('done'):
+                            self._record(host, chunk)
+                        yield chunk
+                    return
+                except Exception as e:
+                    if not self._host_failed(host, e):
+                        raise
+                    tried.append(host)
+            if started:
+                yield {'failover': host.name}
+
+    def display_stats(self):
+        """Per-host request counts, failures and throughput."""
+        from rich.table import Table
+        table = Table(show_header=True, header_style="bold magenta")
+        for column in ["Host", "Status", "Requests", "Failures", "Prompt tok", "Generated tok", "Decode tok/s", "Busy"]:
+            table.add_column(column, justify="left" if column in ("Host", "Status") else "right")
+        for host in self.hosts:
+            stats = host.stats
+            decode = f"{stats['eval_tokens'] / stats['eval_s']:.1f}" if stats["eval_s"] else "N/A"
+            table.add_row(host.name, "[green]up[/green]" if host.healthy else "[red]down[/red]", str(stats["requests"]),
+                          str(stats["failures"]), str(stats["prompt_tokens"]), str(stats["eval_tokens"]), decode, f"{stats['busy_s']:.1f}s")
+            emit_metrics("host", host=host.name, url=host.url, healthy=host.healthy, **stats)
+        console.print("🖧 [bold]Hosts:[/bold]")
+        console.print(table)
+
+_host_pool = None
+_host_pool_loaded = False
+_host_pool_lock = threading.Lock()
+
+def get_host_pool():
+    """The pool from hosts.toml, loaded once per process; None means use the local server only."""
+    global _host_pool, _host_pool_loaded
+    with _host_pool_lock:
+        if not _host_pool_loaded:
+            _host_pool = HostPool.load()
+            _host_pool_loaded = True
+        return _host_pool
+
+def display_hosts():
+    """Health, latency and models of each configured host."""
+    from rich.table import Table
+    try:
+        pool = get_host_pool()
+    except Exception as e:
+        console.print(f"❌ [red]Could not read {HOSTS_FILE}: {e}[/red]")
+        return
+    if pool is None:
+        console.print(f"ℹ️ [yellow]No {HOSTS_FILE}; Delta uses the local Ollama server only.[/yellow]")
+        return
+    pool.check(force=True)
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Host", style="cyan")
+    table.add_column("URL")
+    table.add_column("Status")
+    table.add_column("Latency", justify="right")
+    table.add_column("Parallel", justify="right")
+    table.add_column("Models")
+    for host in pool.hosts:
+        table.add_row(
+            host.name, host.url, "[green]up[/green]" if host.healthy else "[red]down[/red]",
+            f"{host.latency * 1000:.0f} ms" if host.healthy and host.latency is not None else "N/A",
+            str(host.parallel), ", ".join(sorted(host.inventory)) if host.healthy else "",
+        )
+    console.print("🖧 [bold]Hosts:[/bold]")
+    console.print(table)
+
+# Model residency
+KEEP_ALIVE = "30m"  # How long Ollama keeps the model loaded after each request
 
-def run_model(model_name, use_wiki=False, use_arxiv=False, use_ddg=False, doc_path=None, use_think=False):
+def parse_keep_alive(value):
+    """Validate a keep-alive such as '30m', '1h', '300' (seconds), '0' (unload) or '-1' (forever)."""
+    text = str(value).strip().lower()
+    if re.fullmatch(r"-?\d+", text):
+        return int(text)
+    if re.fullmatch(r"-?\d+(\.\d+)?(ms|s|m|h)", text):
+        return text
+    raise argparse.ArgumentTypeError(f"invalid keep-alive '{value}', expected e.g. 30m, 1h, 0 or -1")
+
+def preload_model(model_name, num_ctx=NUM_CTX, keep_alive=KEEP_ALIVE):
+    """Load the model in a background thread; returns a Future with the load timings.
+
+    An empty generate request makes Ollama load the model without producing tokens. num_ctx
+    must match the later requests, otherwise Ollama reloads the model for the first question.
+    """
+    from concurrent.futures import Future
+    future = Future()
+
+    def load():
+        start = time.perf_counter()
+        try:
+            pool = get_host_pool()
+            if pool is not None:
+                # Warms the host the first turn will be routed to (least loaded, then fastest)
+                response = pool.request(model_name, 'generate', prompt="", keep_alive=keep_alive, options={'num_ctx': num_ctx})
+            else:
+                response = get_ollama_client().generate(model=model_name, prompt="", keep_alive=keep_alive, options={'num_ctx': num_ctx})
+            future.set_result({
+                "load_s": (response.get('load_duration') or 0) / 1e9,
+                "wall_s": time.perf_counter() - start,
+            })
+        except Exception as e:
+            future.set_exception(e)
+
+    threading.Thread(target=load, name="delta-preload", daemon=True).start()
+    return future
+
+# Streaming output
+RENDER_FPS = 30  # Repaints per second while an answer streams
+
+class StreamRenderer:
+    """Coalesces streamed tokens and repaints at most fps times a second.
+
+    On a terminal the text goes through rich, either as styled text or, with markdown=True, as
+    live-rendered Markdown: finished blocks are printed once and only the block still being
+    written is repainted. When stdout is not a terminal, chunks are written as they are, with no
+    markup or styling work.
+    """
+
+    def __init__(self, style=None, markdown=False, fps=RENDER_FPS, target=None, clock=time.perf_counter):
+        from rich.color import ColorSystem
+        from rich.style import Style
+        self.console = target or console
+        self.style = style or ""
+        # Styling resolved to ANSI once, so a repaint is one write instead of a rich render pass;
+        # None (no colour, legacy Windows console) falls back to console.print
+        self._color_system = {"standard": ColorSystem.STANDARD, "256": ColorSystem.EIGHT_BIT,
+                              "truecolor": ColorSystem.TRUECOLOR}.get(self.console.color_system)
+        self._ansi_style = Style.parse(self.style) if self.style else Style()
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self.clock = clock
+        self.plain = not self.console.is_terminal
+        self.markdown = markdown and not self.plain
+        self._parts = []     # Everything written so far
+        self._committed = 0  # Markdown: length of the text already printed as finished blocks
+        self._blocks_printed = False
+        self._pending = ""   # Written but not yet painted
+        self._last_paint = None
+        self._timer = None
+        self._live = None
+        self.tokens = 0
+        self.frames = 0
+        self.render_s = 0.0
+
+    def write(self, content):
+        if not content:
+            return
+        self.tokens += 1
+        if self.plain:
+            start = time.perf_counter()
+            self.console.file.write(content)
+            self.render_s += time.perf_counter() - start
+            return
+        self._parts.append(content)
+        self._pending += content
+        now = self.clock()
+        if self._last_paint is None or now - self._last_paint >= self.interval:
+            self.flush()
+        elif self._timer is None:
+            self._schedule(self.interval - (now - self._last_paint))
+
+    def _schedule(self, delay):
+        """Paint leftover text even if no further token arrives (needs a running event loop)."""
+        asyncio = sys.modules.get("asyncio")
+        if asyncio is None:
+            return  # Never imported, so no loop can be running
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Sync callers: the next write() or close() paints it
+        self._timer = loop.call_later(delay, self.flush)
+
+    def flush(self):
+        """Paint the buffered text now."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        start = time.perf_counter()
+        if self.markdown:
+            from rich.markdown import Markdown
+            if self._live is None:
+                from rich.live import Live
+                # Transient and cropped: the region never outgrows the screen, and close() prints
+                # its final contents once, so nothing is left duplicated in the scrollback
+                self._live = Live(console=self.console, auto_refresh=False, transient=True, vertical_overflow="crop")
+                self._live.start()
+            tail = self._markdown_tail()
+            done = self._block_end(tail)
+            if done:
+                self._print_blocks(tail[:done])  # Goes above the live region, permanently
+                tail = tail[done:]
+            self._live.update(self._spaced(Markdown(tail)), refresh=True)
+        elif self._color_system is not None:
+            self.console.file.write(self._ansi_style.render(self._pending, color_system=self._color_system))
+            self.console.file.flush()
+        else:
+            from rich.text import Text
+            self.console.print(Text(self._pending, style=self.style), end="", soft_wrap=True)
+        self._pending = ""
+        self._last_paint = self.clock()
+        self.frames += 1
+        self.render_s += time.perf_counter() - start
+
+    def _spaced(self, renderable):
+        """renderable, after a blank line if blocks were printed before it (as one document would be)."""
+        if not self._blocks_printed:
+            return renderable
+        from rich.console import Group
+        return Group("", renderable)
+
+    def _print_blocks(self, text):
+        from rich.markdown import Markdown
+        if text.strip():
+            self.console.print(self._spaced(Markdown(text)))
+            self._blocks_printed = True
+        self._committed += len(text)
+
+    def _markdown_tail(self):
+        """The text not yet printed as finished blocks."""
+        text = "".join(self._parts)
+        self._parts = [text]
+        return text[self._committed:]
+
+    @staticmethod
+    def _block_end(text):
+        """Length of the leading run of complete Markdown blocks in text: up to its last blank
+        line outside a fenced code block (0 if there is none)."""
+        end = offset = 0
+        fenced = False
+        for line in text.splitlines(keepends=True):
+            offset += len(line)
+            stripped = line.strip()
+            if stripped.startswith(("```", "~~~")):
+                fenced = not fenced
+            elif not stripped and not fenced and line.endswith("\n"):
+                end = offset
+        return end
+
+    def reset(self):
+        """Start over (after a failover the answer restarts from scratch)."""
+        self.close()
+        self._parts = []
+        self._committed = 0
+        self._blocks_printed = False
+
+    def close(self):
+        """Paint whatever is still buffered and end the live region."""
+        self.flush()
+        if self._live is not None:
+            self._live.stop()  # Transient: clears the repainted block
+            self._live = None
+            self._print_blocks(self._markdown_tail())
+        if self.plain:
+            self.console.file.flush()
+
+    def stats(self):
+        return {
+            "render_frames": self.frames,
+            "render_us_per_token": self.render_s / self.tokens * 1e6 if self.tokens else None,
+        }
+
+@contextmanager
+def cancel_on_keypress(task):
+    """While the block runs, Esc or Ctrl+C cancels task instead of ending the session."""
+    if not sys.stdin.isatty():
+        yield
+        return
+    import asyncio
+    from prompt_toolkit.input import create_input
+    from prompt_toolkit.keys import Keys
+    keyboard = create_input()
+    loop = asyncio.get_running_loop()
+
+    def handle(key_presses):
+        if any(key_press.key in (Keys.Escape, Keys.ControlC) for key_press in key_presses):
+            task.cancel()
+
+    def on_keys():
+        handle(keyboard.read_keys())
+        # A lone Esc is held back in case an escape sequence follows; release it after a moment
+        loop.call_later(0.05, lambda: handle(keyboard.flush_keys()))
+
+    with keyboard.raw_mode(), keyboard.attach(on_keys):
+        yield
+
+def run_model(model_name, use_wiki=False, use_arxiv=False, use_ddg=False, doc_path=None, use_think=False, context_timeout=CONTEXT_TIMEOUT, embed_model=None, num_ctx=NUM_CTX, keep_alive=KEEP_ALIVE, markdown=False, fps=RENDER_FPS):
     """Run interactive session with streamlined responses or generate dot art."""
-    import ollama
+    import asyncio
+    try:
+        asyncio.run(run_session(model_name, use_wiki, use_arxiv, use_ddg, doc_path, use_think, context_timeout, embed_model, num_ctx, keep_alive, markdown, fps))
+    except KeyboardInterrupt:
+        console.print("\n👋 [bold green]Session ended. Come back soon![/bold green]")
+
+async def run_session(model_name, use_wiki, use_arxiv, use_ddg, doc_path, use_think, context_timeout, embed_model, num_ctx, keep_alive, markdown=False, fps=RENDER_FPS):
+    """The interactive loop. Each answer runs as a task that Esc/Ctrl+C cancels, and history is
+    saved in the background while the next question is typed."""
+    import asyncio
     from rich.progress import Progress, SpinnerColumn, TextColumn
+    from concurrent.futures import ThreadPoolExecutor
+    from prompt_toolkit import PromptSession
+    from prompt_toolkit.key_binding import KeyBindings
     global query_streak
-    console.print(f"🚀 [bold green]Delta with {model_name} (Wiki: {use_wiki}, arXiv: {use_arxiv}, DuckDuckGo: {use_ddg}, Docs: {doc_path})[/bold green]")
+    docs_label = ", ".join(doc_path) if isinstance(doc_path, (list, tuple)) else doc_path
+    console.print(f"🚀 [bold green]Delta with {model_name} (Wiki: {use_wiki}, arXiv: {use_arxiv}, DuckDuckGo: {use_ddg}, Docs: {docs_label})[/bold green]")
+
+    pool = get_host_pool()
+    if pool is not None:
+        healthy = await asyncio.get_running_loop().run_in_executor(None, pool.check)
+        console.print(f"🖧 [bold]Host pool:[/bold] {len(healthy)}/{len(pool.hosts)} hosts up ({', '.join(host.name for host in healthy)})")
+
+    # Load the model while the documents are indexed and the first question is typed
+    preload = preload_model(model_name, num_ctx, keep_alive)
 
     # Create key bindings
     bindings = KeyBindings()
@@ -382,6 +2609,7 @@ def run_model(model_name, use_wiki=False, use_arxiv=False, use_ddg=False, doc_pa
     def _(event):
         buffer = event.app.current_buffer
         if buffer.selection_state:
+            import pyperclip
             selected_text = buffer.copy_selection()
             pyperclip.copy(selected_text)
             console.print("[green]Text copied to clipboard.[/green]")
@@ -392,111 +2620,454 @@ def run_model(model_name, use_wiki=False, use_arxiv=False, use_ddg=False, doc_pa
     # Paste with Ctrl+V
     @bindings.add('c-v')
     def _(event):
+        import pyperclip
         clipboard_content = pyperclip.paste()
         event.app.current_buffer.insert_text(clipboard_content)
 
     # Initialize prompt with instructions
-    console.print("[yellow]Type your question. Use Enter for new lines, Ctrl+J to send, Shift+Arrows to select, Ctrl+C to copy/exit, Ctrl+V to paste.[/yellow]")
+    console.print("[yellow]Type your question. Use Enter for new lines, Ctrl+J to send, Shift+Arrows to select, Ctrl+C to copy/exit, Ctrl+V to paste, Esc to stop an answer.[/yellow]")
     session = PromptSession(multiline=True, key_bindings=bindings)
 
-    messages = []
-    while True:
-        console.print(f"🔥 [bold]Streak: {query_streak}[/bold]")
-        try:
-            user_input = session.prompt('> ')
-        except KeyboardInterrupt:
-            console.print("👋 [bold green]Session ended. Come back soon![/bold green]")
-            break
-        except EOFError:
-            console.print("👋 [bold green]Session ended. Come back soon![/bold green]")
-            break
-        if user_input.lower() == "exit":
-            console.print("👋 [bold green]Session ended. Come back soon![/bold green]")
-            break
-
-        query_streak += 1
-        query_history.append(user_input)
-        
+    if doc_path:
+        # Index the corpus while the first question is typed. A question asked before the index
+        # is ready is answered by streaming the files, stopping once enough passages match.
+        submit_daemon(lambda: fetch_document_context(doc_path, embed_model=embed_model), "delta-docs-index")
+
+    # Persist history off the response path; flush whatever is queued on exit or SIGTERM
+    history_writer = HistoryWriter()
+    atexit.register(history_writer.close)
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+    # Runs retrieval alongside the think pass; two workers so a fetch abandoned by a
+    # cancelled turn doesn't hold up the next one
+    retrieval_pool = ThreadPoolExecutor(max_workers=2)
+    loop = asyncio.get_running_loop()
+    saves = set()  # History writes still in flight
+
+    conversation = ConversationWindow(num_ctx)
+
+    async def answer(user_input, turn):
+        """Retrieve, think and stream one answer, keeping progress in turn for the caller."""
+        uses_context = use_wiki or use_arxiv or use_ddg or doc_path
         if use_think:
+            # Retrieve on the raw question while the model thinks, so the turn costs max(think, fetch)
+            retrieval = loop.run_in_executor(retrieval_pool, get_context, user_input, use_wiki, use_arxiv, use_ddg, doc_path, context_timeout, embed_model)
             with Progress(
                 SpinnerColumn(),
                 TextColumn("[progress.description]{task.description}"),
                 transient=True
             ) as progress:
                 task = progress.add_task("Processing query...", total=None)
-                thought = think_about_question(model_name, user_input)
+                thought = await think_about_question(model_name, user_input, num_ctx, keep_alive)
+                progress.update(task, completed=True)  # Ensure spinner stops
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                transient=True
+            ) as progress:
+                task = progress.add_task("Fetching context...", total=None)
+                context, citations, images, url = await retrieval
+                refined_query = refine_query(user_input, thought)
+                if uses_context and not context and refined_query != user_input:
+                    # Nothing matched the raw question; try again with the terms the thought surfaced
+                    context, citations, images, url = await loop.run_in_executor(retrieval_pool, get_context, refined_query, use_wiki, use_arxiv, use_ddg, doc_path, context_timeout, embed_model)
                 progress.update(task, completed=True)  # Ensure spinner stops
-            refined_query = f"{user_input} {thought}"
         else:
-            refined_query = user_input
-
-        # Add spinner for context fetching
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            transient=True
-        ) as progress:
-            task = progress.add_task("Fetching context...", total=None)
-            context, citations, images, url = get_context(refined_query, use_wiki, use_arxiv, use_ddg, doc_path)
-            progress.update(task, completed=True)  # Ensure spinner stops
+            # Add spinner for context fetching
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                transient=True
+            ) as progress:
+                task = progress.add_task("Fetching context...", total=None)
+                context, citations, images, url = await loop.run_in_executor(retrieval_pool, get_context, user_input, use_wiki, use_arxiv, use_ddg, doc_path, context_timeout, embed_model)
+                progress.update(task, completed=True)  # Ensure spinner stops
 
-        if not context:
-            prompt = f"Question: {user_input}\nAnswer concisely using your knowledge."
-        else:
-            prompt = f"Context: {context}\nQuestion: {user_input}\nAnswer concisely."
+        if context:
             console.print("✅ [green]Using retrieved context[/green]")
+        turn.update(context=context, citations=citations, url=url)
+        prompt = conversation.prompt_for(user_input, context)
 
-        messages.append({'role': 'user', 'content': prompt})
+        messages = conversation.messages_for(prompt)
 
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            transient=True
-        ) as progress:
-            task = progress.add_task("Generating response...", total=None)
-            response_chunks = ollama.chat(
+        request_start = time.perf_counter()
+        if pool is not None:
+            response_chunks = pool.astream(
+                model_name, 'chat',
+                messages=messages,
+                options={'num_ctx': num_ctx, 'max_tokens': 250},
+                keep_alive=keep_alive
+            )
+        else:
+            response_chunks = get_ollama_client().astream(
+                'chat',
                 model=model_name,
                 messages=messages,
-                options={'num_ctx': 2048, 'max_tokens': 250},
-                stream=True
+                options={'num_ctx': num_ctx, 'max_tokens': 250},
+                keep_alive=keep_alive
             )
 
-        full_response = ""
-        start_time = time.time()
-        for chunk in response_chunks:
-            content = chunk.get('message', {}).get('content', '')
-            console.print(content, end="", style="cyan")
-            full_response += content
+        first_token_at = None
+        final_chunk = None
+        renderer = StreamRenderer(style="cyan", markdown=markdown, fps=fps)
+        try:
+            async for chunk in response_chunks:
+                if chunk.get('failover'):
+                    # The host died mid-answer; the answer restarts on another host
+                    renderer.reset()
+                    console.print(f"\n[yellow]↻ {chunk['failover']} went away, answering again on another host[/yellow]")
+                    turn["response"], first_token_at = "", None
+                    continue
+                content = chunk.get('message', {}).get('content', '')
+                if content and first_token_at is None:
+                    first_token_at = time.perf_counter()
+                renderer.write(content)
+                turn["response"] += content
+                if chunk.get('done'):
+                    final_chunk = chunk  # Carries Ollama's prompt/eval counters and durations
+        finally:
+            renderer.close()  # Also paints the part already received when the turn is cancelled
+        metrics = generation_metrics(final_chunk, request_start, first_token_at, time.perf_counter())
+        metrics.update(renderer.stats())
+        return metrics
 
-        console.print()
-        end_time = time.time()
+    while True:
+        console.print(f"🔥 [bold]Streak: {query_streak}[/bold]")
+        try:
+            user_input = await session.prompt_async('> ')
+        except KeyboardInterrupt:
+            console.print("👋 [bold green]Session ended. Come back soon![/bold green]")
+            break
+        except EOFError:
+            console.print("👋 [bold green]Session ended. Come back soon![/bold green]")
+            break
+        if user_input.lower() == "exit":
+            console.print("👋 [bold green]Session ended. Come back soon![/bold green]")
+            break
 
-        elapsed_time = end_time - start_time
-        token_count = len(full_response.split())
-        if elapsed_time > 0:
-            console.print(f"⚡ [bold]Speed: {token_count / elapsed_time:.2f} tokens/s[/bold]")
+        query_streak += 1
+        query_history.append(user_input)
 
-        if context and citations:
-            console.print("📚 [bold]Sources:[/bold]")
-            for i, citation in enumerate(citations, 1):
-                console.print(f"{i}. {citation}")
-            if url:
-                console.print(f"🔗 [bold]Link:[/bold] {url}")
+        if preload is not None:
+            # Finish the background load first so it is reported on its own, not in this turn's TTFT
+            wait_start = time.perf_counter()
+            with console.status("Loading model..."):
+                try:
+                    load = await asyncio.wrap_future(preload)
+                except Exception as e:
+                    console.print(f"[yellow]Model preload failed: {e}[/yellow]")
+                else:
+                    waited = time.perf_counter() - wait_start
+                    if load["load_s"] >= 0.05:
+                        waited_note = f", waited {waited:.2f}s for it" if waited >= 0.05 else " while you typed"
+                        console.print(f"🧠 [dim]Model loaded in {load['load_s']:.2f}s{waited_note}[/dim]")
+                    emit_metrics("preload", model=model_name, waited_s=waited, **load)
+            preload = None
+        
+        turn = {"response": "", "context": "", "citations": [], "url": None}
+        turn_task = asyncio.ensure_future(answer(user_input, turn))
+        with cancel_on_keypress(turn_task):
+            try:
+                metrics = await turn_task
+            except asyncio.CancelledError:
+                metrics = None
+            except NoHostAvailable as e:
+                console.print(f"\n❌ [red]{e}[/red]")
+                continue
+            except Exception as e:
+                # A failed turn (server error, retries exhausted) ends that answer, not the session
+                console.print(f"\n❌ [red]Error: {e}[/red]")
+                emit_metrics("turn", model=model_name, error=str(e), partial_chars=len(turn["response"]))
+                continue
 
-        messages.append({'role': 'assistant', 'content': full_response})
-        save_interaction(user_input, full_response)
+        console.print()
+        if metrics is None:
+            # Stopped by a keypress: the server request is closed, the session and its context go on
+            console.print("⏹️ [yellow]Stopped.[/yellow]")
+            emit_metrics("turn", model=model_name, cancelled=True, partial_chars=len(turn["response"]))
+        else:
+            console.print(f"⚡ [bold]{format_metrics(metrics)}[/bold]")
+            emit_metrics("turn", model=model_name, request_tokens_estimate=conversation.last_request_tokens, **metrics)
+            folded = f", {len(conversation.summary_lines)} summarised" if conversation.summary_lines else ""
+            console.print(f"📨 [dim]~{conversation.last_request_tokens}/{num_ctx} tokens sent ({len(conversation.turns)} earlier turns{folded})[/dim]")
+
+            if turn["context"] and turn["citations"]:
+                console.print("📚 [bold]Sources:[/bold]")
+                for i, citation in enumerate(turn["citations"], 1):
+                    console.print(f"{i}. {citation}")
+                if turn["url"]:
+                    console.print(f"🔗 [bold]Link:[/bold] {turn['url']}")
+
+        if turn["response"]:
+            # A stopped answer is kept as far as it got, so follow-up questions can refer to it
+            conversation.add_turn(user_input, turn["response"])
+            save = loop.run_in_executor(None, history_writer.submit, user_input, turn["response"])
+            saves.add(save)
+            save.add_done_callback(saves.discard)
 
         if query_history:
             console.print(f"💡 [italic]Try: {query_history[-1]}[/italic]")
 
-def list_models():
+    if saves:
+        await asyncio.gather(*saves)
+    retrieval_pool.shutdown(wait=False)
+    history_writer.close()
+    stats = history_writer.stats()
+    emit_metrics("history_writer", **stats)
+    if stats["flushes"]:
+        console.print(f"💾 [italic]History: {stats['saved']} saved in {stats['flushes']} writes, avg {stats['avg_flush_ms']:.1f} ms, max {stats['max_flush_ms']:.1f} ms, peak queue {stats['max_queue_depth']}[/italic]")
+    if pool is not None:
+        pool.display_stats()
+
+def build_prompt(question, context=""):
+    """Prompt sent to the model for a question, with or without retrieved context."""
+    if not context:
+        return f"Question: {question}\nAnswer concisely using your knowledge."
+    return f"Context: {context}\nQuestion: {question}\nAnswer concisely."
+
+# Offline batch processing
+BATCH_CONCURRENCY = 4
+
+def read_batch_inputs(input_path):
+    """Yield (id, prompt) from a JSON-lines file without loading it whole.
+
+    Each line is {"id": ..., "prompt": ...}; a missing id defaults to the line number.
+    """
+    with open(input_path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                console.print(f"[yellow]Skipping line {number}: not valid JSON[/yellow]")
+                continue
+            if isinstance(item, str):
+                item = {"prompt": item}
+            prompt = item.get("prompt") or item.get("question") or item.get("input")
+            if not prompt:
+                console.print(f"[yellow]Skipping line {number}: no 'prompt' field[/yellow]")
+                continue
+            yield str(item.get("id", number)), prompt
+
+def completed_batch_ids(output_path):
+    """Ids already answered without error in an existing output file."""
+    done = set()
+    if not Path(output_path).exists():
+        return done
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                item = json.loads(line)
+            except ValueError:
+                continue  # Torn last line from a crash
+            if "id" in item and not item.get("error"):
+                done.add(str(item["id"]))
+    return done
+
+def answer_batch_item(model_name, item_id, prompt, use_wiki, use_arxiv, use_ddg, doc_path, context_timeout, embed_model, num_ctx):
+    """Answer one batch prompt; errors are returned in the record rather than raised."""
+    record = {"id": item_id, "prompt": prompt}
+    try:
+        context, citations = "", []
+        if use_wiki or use_arxiv or use_ddg or doc_path:
+            context, citations, _, _ = get_context(prompt, use_wiki, use_arxiv, use_ddg, doc_path, timeout=context_timeout, embed_model=embed_model)
+        start = time.perf_counter()
+        # Same budget as an interactive turn, so long context is cut here rather than by Ollama
+        messages = [{'role': 'user', 'content': ConversationWindow(num_ctx).prompt_for(prompt, context)}]
+        pool = get_host_pool()
+        if pool is not None:
+            response = pool.request(model_name, 'chat', messages=messages, options={'num_ctx': num_ctx})
+        else:
+            response = get_ollama_client().chat(model=model_name, messages=messages, options={'num_ctx': num_ctx})
+        record["response"] = response['message']['content']
+        record["citations"] = citations
+        record["metrics"] = generation_metrics(response, start, None, time.perf_counter())
+    except Exception as e:
+        record["error"] = str(e)
+    return record
+
+def run_batch(model_name, input_path, output_path, concurrency=BATCH_CONCURRENCY, ordered=False, use_wiki=False,
+              use_arxiv=False, use_ddg=False, doc_path=None, context_timeout=CONTEXT_TIMEOUT, embed_model=None, num_ctx=NUM_CTX):
+    """Answer every prompt in a JSON-lines file, appending results as they finish."""
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+
+    if not Path(input_path).is_file():
+        console.print(f"[red]Error: {input_path} is not a valid file[/red]")
+        return
+    done_ids = completed_batch_ids(output_path)
+    if done_ids:
+        console.print(f"[italic]Resuming: {len(done_ids)} prompt(s) already answered in {output_path}[/italic]")
+    if doc_path:
+        fetch_document_context(doc_path, embed_model=embed_model)
+
+    answered = errors = skipped = duplicates = generated_tokens = 0
+    seen = set()  # Ids submitted in this run
+    start = time.perf_counter()
+    max_in_flight = concurrency * 2  # Read ahead just enough to keep every worker busy
+    with open(output_path, 'a', encoding='utf-8') as out, \
+            ThreadPoolExecutor(max_workers=concurrency) as pool, \
+            Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), transient=True) as progress:
+        task = progress.add_task("Answering...", total=None)
+        if ends_with_torn_line(output_path):
+            out.write("\n")  # Close the record a crash cut short, so the next one starts on its own line
+
+        def write(record):
+            nonlocal answered, errors, generated_tokens
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            if record.get("error"):
+                errors += 1
+            else:
+                answered += 1
+                generated_tokens += record["metrics"]["eval_tokens"]
+            elapsed = time.perf_counter() - start
+            progress.update(task, description=f"Answered {answered} ({answered / elapsed:.2f} prompts/s, {errors} errors)")
+
+        def drain(pending, until):
+            while len(pending) > until:
+                if ordered:
+                    write(pending.popleft().result())
+                else:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        pending.remove(future)
+                        write(future.result())
+
+        pending = deque()
+        try:
+            for item_id, prompt in read_batch_inputs(input_path):
+                if item_id in done_ids:
+                    skipped += 1
+                    continue
+                if item_id in seen:
+                    duplicates += 1
+                    console.print(f"[yellow]Skipping duplicate id {item_id}: already answered in this run[/yellow]")
+                    continue
+                seen.add(item_id)
+                pending.append(pool.submit(
+                    answer_batch_item, model_name, item_id, prompt, use_wiki, use_arxiv, use_ddg,
+                    doc_path, context_timeout, embed_model, num_ctx
+                ))
+                drain(pending, max_in_flight - 1)  # Backpressure: stop reading until a slot frees up
+        except KeyboardInterrupt:
+            console.print("[yellow]Interrupted: finishing in-flight prompts; rerun the same command to resume.[/yellow]")
+        drain(pending, 0)
+        os.fsync(out.fileno())
+
+    elapsed = time.perf_counter() - start
+    skipped_note = f"{skipped} skipped, {duplicates} duplicate id(s)" if duplicates else f"{skipped} skipped"
+    console.print(f"✅ [green]{answered} answered, {errors} failed, {skipped_note} in {elapsed:.1f}s "
+                  f"({answered / elapsed if elapsed else 0:.2f} prompts/s, {generated_tokens / elapsed if elapsed else 0:.1f} generated tok/s)[/green]")
+    emit_metrics("batch", model=model_name, answered=answered, errors=errors, skipped=skipped, duplicates=duplicates,
+                 elapsed_s=elapsed, generated_tokens=generated_tokens)
+    if get_host_pool() is not None:
+        get_host_pool().display_stats()
+
+# Installed-model registry, cached so startup and 'delta list' don't wait on the server
+MODEL_REGISTRY_FILE = Path.home() / ".delta" / "cache" / "models.json"
+MODEL_REGISTRY_TTL = 300  # Seconds to trust the cache for a remote server, or when the local model store isn't visible
+
+def ollama_manifest_dir():
+    """Return Ollama's local manifest directory, or None if it isn't on this machine."""
+    candidates = [Path(os.environ["OLLAMA_MODELS"])] if os.environ.get("OLLAMA_MODELS") else []
+    candidates += [Path.home() / ".ollama" / "models", Path("/usr/share/ollama/.ollama/models")]
+    for models_dir in candidates:
+        if (models_dir / "manifests").is_dir():
+            return models_dir / "manifests"
+    return None
+
+def is_local_host(host):
+    """True if an OLLAMA_HOST-style address (empty meaning the default) is this machine."""
+    from urllib.parse import urlsplit
+    host = (host or "").strip()
+    if not host:
+        return True
+    hostname = urlsplit(host if "://" in host else f"http://{host}").hostname
+    return hostname in (None, "localhost", "127.0.0.1", "0.0.0.0", "::1")
+
+def manifest_mtime():
+    """Latest mtime in the manifest tree; changes whenever a model is pulled, created or removed."""
+    manifests = ollama_manifest_dir()
+    if manifests is None:
+        return None
+    latest = manifests.stat().st_mtime
+    for root, dirs, files in os.walk(manifests):
+        for name in dirs + files:
+            try:
+                latest = max(latest, os.stat(os.path.join(root, name)).st_mtime)
+            except OSError:
+                continue  # Removed while we walked
+    return latest
+
+def invalidate_model_registry():
+    """Forget the cached model list (after pull/remove)."""
+    try:
+        MODEL_REGISTRY_FILE.unlink()
+    except FileNotFoundError:
+        pass
+
+def installed_models(refresh=False, pooled=True):
+    """Return installed models as dicts, from the registry cache when it is still valid.
+
+    With a host pool the models of every healthy host are returned, each tagged with 'host'.
+    """
+    from datetime import datetime
+
+    pool = get_host_pool() if pooled else None
+    if pool is not None:
+        return pool.installed_models()
+    host = _ollama_client_settings.get("host") or os.environ.get("OLLAMA_HOST", "")
+    # Local manifests only describe a local server; a remote one is trusted for MODEL_REGISTRY_TTL
+    mtime = manifest_mtime() if is_local_host(host) else None
+    if not refresh:
+        try:
+            with open(MODEL_REGISTRY_FILE, 'r', encoding='utf-8') as f:
+                registry = json.load(f)
+            if registry.get("host") == host and (
+                registry.get("manifest_mtime") == mtime if mtime is not None
+                else time.time() - registry.get("fetched", 0) < MODEL_REGISTRY_TTL
+            ):
+                models = registry["models"]
+                for model in models:
+                    if model.get("modified_at"):
+                        model["modified_at"] = datetime.fromisoformat(model["modified_at"])
+                return models
+        except (OSError, ValueError, KeyError):
+            pass  # Missing or corrupt: rebuild from the server
+
+    models = []
+    for model in get_ollama_client().list().get('models', []):
+        models.append({
+            'model': model.get('model'),
+            'size': model.get('size'),
+            'digest': model.get('digest'),
+            'modified_at': model.get('modified_at'),
+            'details': dict(model.get('details') or {}),
+        })
+    registry = {
+        "host": host,
+        "manifest_mtime": mtime,
+        "fetched": time.time(),
+        "models": [{**m, 'modified_at': m['modified_at'].isoformat() if m['modified_at'] else None} for m in models],
+    }
+    MODEL_REGISTRY_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = MODEL_REGISTRY_FILE.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(registry, f)
+    os.replace(tmp, MODEL_REGISTRY_FILE)
+    return models
+
+def list_models(refresh=False):
     """List available models with detailed information."""
-    import ollama
     from rich.table import Table
     
     try:
-        response = ollama.list()
-        models = response.get('models', [])
+        models = installed_models(refresh)
     except Exception as e:
         console.print(f"❌ [red]Error listing models: {str(e)}[/red]")
         return
@@ -505,8 +3076,11 @@ def list_models():
         console.print("ℹ️ [yellow]No models installed. Use 'delta pull <model>' to download one.[/yellow]")
         return
 
+    pooled = any('host' in model for model in models)
     table = Table(show_header=True, header_style="bold magenta")
     table.add_column("Model Name", style="cyan", no_wrap=True)
+    if pooled:
+        table.add_column("Host")
     table.add_column("Size", justify="right")
     table.add_column("Modified At", justify="right")
     table.add_column("Format")
@@ -523,58 +3097,93 @@ def list_models():
         params = details.get('parameter_size', 'N/A').replace('B', '') + "B" if details.get('parameter_size') else 'N/A'
         quant = details.get('quantization_level', 'N/A')
 
-        table.add_row(name, size, modified_at, fmt, params, quant)
+        if pooled:
+            table.add_row(name, model['host'], size, modified_at, fmt, params, quant)
+        else:
+            table.add_row(name, size, modified_at, fmt, params, quant)
 
     console.print("📋 [bold]Installed Models:[/bold]")
     console.print(table)
 
-def pull_model(model_name):
-    import ollama
+def pull_model(model_name, host=None):
     from rich.progress import Progress, SpinnerColumn, BarColumn, DownloadColumn, TextColumn, TimeRemainingColumn
     from rich.console import Console
     console = Console()
 
+    # With a host pool, download to every healthy host (or just the named one)
     try:
-        console.print(f"⬇️ Downloading {model_name}")
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            BarColumn(),
-            DownloadColumn(),
-            TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-            TimeRemainingColumn(),
-            transient=True
-        ) as progress:
-            task = progress.add_task(f"Downloading {model_name}", total=None)
-            response = ollama.pull(model_name, stream=True)
-            layers = {}
-            total_size = 0
-            for chunk in response:
-                if chunk.get('status') == 'downloading':
-                    digest = chunk.get('digest', '')
-                    total = int(chunk.get('total', 0))
-                    completed = int(chunk.get('completed', 0))
-                    if digest not in layers:
-                        layers[digest] = {'total': total, 'completed': completed}
-                        total_size += total
-                        if progress.tasks[task].total is None:
-                            progress.update(task, total=total_size)
-                    else:
-                        layers[digest]['completed'] = completed
-                    downloaded = sum(l['completed'] for l in layers.values())
-                    progress.update(task, completed=downloaded)
-            progress.update(task, completed=total_size or 0)
-        console.print(f"✅ {model_name} downloaded successfully!")
+        pool = get_host_pool()
+    except Exception as e:
+        console.print(f"❌ [red]Could not read {HOSTS_FILE}: {e}[/red]")
+        return
+    if pool is None:
+        targets = [("", get_ollama_client())]
+    else:
+        targets = [(f" on {h.name}", h.client) for h in pool.check(force=True) if host in (None, h.name)]
+        if not targets:
+            console.print(f"❌ No healthy host{f' named {host}' if host else ''} to download to")
+            return
+
+    try:
+        for where, client in targets:
+            console.print(f"⬇️ Downloading {model_name}{where}")
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                BarColumn(),
+                DownloadColumn(),
+                TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
+                TimeRemainingColumn(),
+                transient=True
+            ) as progress:
+                task = progress.add_task(f"Downloading {model_name}{where}", total=None)
+                response = client.pull(model_name, stream=True)
+                layers = {}
+                total_size = 0
+                for chunk in response:
+                    if chunk.get('status') == 'downloading':
+                        digest = chunk.get('digest', '')
+                        total = int(chunk.get('total', 0))
+                        completed = int(chunk.get('completed', 0))
+                        if digest not in layers:
+                            layers[digest] = {'total': total, 'completed': completed}
+                            total_size += total
+                            if progress.tasks[task].total is None:
+                                progress.update(task, total=total_size)
+                        else:
+                            layers[digest]['completed'] = completed
+                        downloaded = sum(l['completed'] for l in layers.values())
+                        progress.update(task, completed=downloaded)
+                progress.update(task, completed=total_size or 0)
+            console.print(f"✅ {model_name} downloaded successfully{where}!")
     except Exception as e:
         console.print(f"❌ Download failed: {str(e)}")
         raise
+    finally:
+        invalidate_model_registry()
 
-def remove_model(model_name):
-    """Remove a model."""
-    import ollama
-    console.print(f"🗑️ [yellow]Removing {model_name}...[/yellow]")
-    ollama.delete(model_name)
-    console.print(f"✅ [green]{model_name} removed![/green]")
+def remove_model(model_name, host=None):
+    """Remove a model (from every pooled host that has it, or just the named one)."""
+    try:
+        pool = get_host_pool()
+    except Exception as e:
+        console.print(f"❌ [red]Could not read {HOSTS_FILE}: {e}[/red]")
+        return
+    if pool is None:
+        targets = [("", get_ollama_client())]
+    else:
+        targets = [(f" from {h.name}", h.client) for h in pool.check(force=True)
+                   if host in (None, h.name) and h.has_model(model_name)]
+        if not targets:
+            console.print(f"❌ [red]No healthy host{f' named {host}' if host else ''} has {model_name}[/red]")
+            return
+    try:
+        for where, client in targets:
+            console.print(f"🗑️ [yellow]Removing {model_name}{where}...[/yellow]")
+            client.delete(model_name)
+            console.print(f"✅ [green]{model_name} removed{where}![/green]")
+    finally:
+        invalidate_model_registry()
 
 def setup_delta():
     """Set up Delta CLI with virtual environment for smooth execution."""
@@ -614,7 +3223,8 @@ def setup_delta():
         pip_path = env_dir / "bin" / "pip"
         python_path = env_dir / "bin" / "python"
     
-    libraries = ["rich", "ollama", "wikipedia", "arxiv", "Pillow", "duckduckgo_search", "PyPDF2", "python-docx", "prompt_toolkit", "pyperclip", "pynvml", "psutil", "py-cpuinfo"]
+    libraries = ["rich", "ollama", "wikipedia", "arxiv", "Pillow", "duckduckgo_search", "PyPDF2", "python-docx", "prompt_toolkit", "pyperclip", "pynvml", "psutil", "py-cpuinfo", "numpy",
+                 "tomli; python_version < '3.11'"]
     try:
         subprocess.run([str(pip_path), "install", "--upgrade", "pip"], check=True)
         console.print("[green]Upgraded pip in virtual environment[/green]")
@@ -687,15 +3297,16 @@ def setup_delta():
         console.print("[bold green]Setup complete! On Windows, run: 'python delta.py run mistral --docs C:\\path\\to\\document.pdf'[/bold green]")
 
 def is_model_available(model_name):
-    """Check if the specified model is available locally."""
-    import ollama
-    try:
-        response = ollama.list()
-        models = response.get('models', [])
-        for model in models:
-            if model.get('model') == model_name:
-                return True
-        return False
+    """Check if the specified model is available locally (or on any pooled host)."""
+    try:
+        pool = get_host_pool()
+        if pool is not None:
+            return pool.has_model(model_name)
+        names = (model_name, f"{model_name}:latest")  # An untagged name means :latest, as in Host.has_model
+        if any(model.get('model') in names for model in installed_models()):
+            return True
+        # Not in the cache: it may have been pulled on a server whose model store we can't watch
+        return any(model.get('model') in names for model in installed_models(refresh=True))
     except Exception as e:
         console.print(f"❌ [red]Error checking models: {str(e)}[/red]")
         return False
@@ -719,6 +3330,7 @@ def check_hardware():
     gpu_available = False
     max_vram = 0
     try:
+        import pynvml
         pynvml.nvmlInit()
         deviceCount = pynvml.nvmlDeviceGetCount()
         if deviceCount > 0:
@@ -745,6 +3357,7 @@ def check_hardware():
 
     # Check CPU details
     try:
+        import cpuinfo
         cpu_info = cpuinfo.get_cpu_info()
         cpu_model = cpu_info.get('brand_raw', 'Unknown')
         l3_cache = cpu_info.get('l3_cache_size', 'Unknown')
@@ -756,6 +3369,7 @@ def check_hardware():
         cpu_model = "Unknown"
         l3_cache = "Unknown"
 
+    import psutil
     physical_cores = psutil.cpu_count(logical=False)
     logical_cores = psutil.cpu_count(logical=True)
     if physical_cores and logical_cores:
@@ -803,8 +3417,332 @@ def check_hardware():
 
     console.print("\n[italic]Note: These are estimates based on typical hardware performance and model characteristics. Actual speeds may vary depending on specific model architecture, batch size, and sequence length.[/italic]")
 
+# Benchmarking
+BENCH_DIR = Path.home() / ".delta" / "bench"
+BENCH_PARAGRAPH = (
+    "Local language models trade accuracy for latency and memory. The prompt is first processed "
+    "in a single prefill pass, then tokens are decoded one at a time, each step reading every "
+    "weight of the model from memory. "
+)
+BENCH_PROMPTS = {
+    "short": "Explain in two sentences why the sky is blue.",
+    "medium": BENCH_PARAGRAPH * 8 + "\nSummarize the text above in three bullet points.",
+    "long": BENCH_PARAGRAPH * 32 + "\nSummarize the text above in three bullet points.",
+}
+BENCH_MAX_TOKENS = 128        # Tokens generated per run, so decode speed is comparable
+BENCH_REPEATS = 3             # Runs per prompt; the report keeps the median of each metric
+BENCH_REGRESSION_PCT = 10.0   # Change that counts as a regression when comparing reports
+BENCH_SAMPLE_INTERVAL = 0.2   # Seconds between RSS/CPU samples of the Ollama server
+
+# Metric -> True if higher is better
+BENCH_METRICS = {
+    "ttft_s": False,
+    "prefill_tok_s": True,
+    "decode_tok_s": True,
+    "peak_rss_mb": False,
+}
+
+class ProcessSampler:
+    """Sample peak RSS and CPU use of the Ollama server processes on a background thread."""
+
+    def __init__(self, interval=BENCH_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak_rss = 0
+        self.cpu_samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="delta-bench-sampler", daemon=True)
+
+    def _processes(self):
+        import psutil
+        procs = []
+        for proc in psutil.process_iter(['name']):
+            if (proc.info.get('name') or '').lower().startswith('ollama'):
+                procs.append(proc)
+        return procs
+
+    def _run(self):
+        import psutil
+        procs = self._processes()
+        for proc in procs:
+            try:
+                proc.cpu_percent(None)  # Prime the counters
+            except psutil.Error:
+                pass
+        while not self._stop.wait(self.interval):
+            rss, cpu = 0, 0.0
+            for proc in procs:
+                try:
+                    rss += proc.memory_info().rss
+                    cpu += proc.cpu_percent(None)
+                except psutil.Error:
+                    continue
+            self.peak_rss = max(self.peak_rss, rss)
+            self.cpu_samples.append(cpu / (psutil.cpu_count() or 1))
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def results(self):
+        return {
+            "peak_rss_mb": self.peak_rss / 1e6 if self.peak_rss else None,
+            "cpu_util_pct": sum(self.cpu_samples) / len(self.cpu_samples) if self.cpu_samples else None,
+        }
+
+def bench_prompt(prompt_name):
+    """The named bench prompt behind a fresh nonce, so Ollama cannot reuse a cached prompt prefix
+    from an earlier run (medium and long share their opening text)."""
+    return f"[run {os.urandom(4).hex()}]\n{BENCH_PROMPTS[prompt_name]}"
+
+def median_metrics(samples):
+    """Per-metric median over repeated runs; metrics missing from every run stay None."""
+    import statistics
+    merged = {}
+    for name in samples[0]:
+        values = [sample[name] for sample in samples if isinstance(sample.get(name), (int, float))]
+        merged[name] = statistics.median(values) if values else samples[-1].get(name)
+    return merged
+
+def bench_once(model_name, prompt, num_ctx, num_thread, max_tokens):
+    """Stream one request and return its generation metrics plus server resource use."""
+    options = {'num_ctx': num_ctx, 'num_predict': max_tokens, 'temperature': 0}
+    if num_thread:
+        options['num_thread'] = num_thread
+    with ProcessSampler() as sampler:
+        start = time.perf_counter()
+        first_token_at = None
+        final_chunk = None
+        for chunk in get_ollama_client().chat(model=model_name, messages=[{'role': 'user', 'content': prompt}], options=options, stream=True):
+            if first_token_at is None and chunk.get('message', {}).get('content'):
+                first_token_at = time.perf_counter()
+            if chunk.get('done'):
+                final_chunk = chunk
+        metrics = generation_metrics(final_chunk, start, first_token_at, time.perf_counter())
+    metrics.update(sampler.results())
+    return metrics
+
+def compare_bench_reports(previous, current, threshold=BENCH_REGRESSION_PCT):
+    """Return (key, metric, old, new, change_pct) for every metric that got worse by threshold %."""
+    def key(result):
+        return (result["model"], result["num_ctx"], result.get("num_thread"), result["prompt"])
+    old_results = {key(r): r for r in previous.get("results", [])}
+    regressions = []
+    for result in current.get("results", []):
+        old = old_results.get(key(result))
+        if not old:
+            continue
+        for metric, higher_is_better in BENCH_METRICS.items():
+            before, after = old.get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            change = 100 * (after - before) / before
+            if (change < -threshold) if higher_is_better else (change > threshold):
+                regressions.append((key(result), metric, before, after, change))
+    return regressions
+
+BENCH_RENDER_TOKENS = 500   # Tokens streamed through each output mode by 'delta bench --render'
+BENCH_RENDER_RATE = 100.0   # Simulated arrival rate in tokens per second
+BENCH_MARKDOWN = (
+    "## Prefill and decode\n\n"
+    "- **Prefill** reads the whole prompt in one pass, so it is *compute* bound.\n"
+    "- **Decode** emits one token per step and reads every weight, so it is `memory` bound.\n\n"
+    "Keep the prompt short and the model quantized to speed up both phases.\n\n"
+)
+
+def run_render_benchmark(tokens=BENCH_RENDER_TOKENS, rate=BENCH_RENDER_RATE, fps=RENDER_FPS):
+    """Render cost per token of each streaming mode, on a simulated answer (no Ollama needed)."""
+    import io
+    from rich.console import Console
+    from rich.table import Table
+
+    words = re.findall(r"\S+\s*", BENCH_MARKDOWN)
+    pieces = (words * (tokens // len(words) + 1))[:tokens]
+
+    def measure(mode, terminal):
+        target = Console(file=io.StringIO(), force_terminal=terminal, width=console.width, color_system="standard" if terminal else None)
+        now = [0.0]
+        renderer = None
+        if mode != "per-chunk print":
+            renderer = StreamRenderer(style="cyan", markdown=mode.startswith("markdown"), fps=0 if mode.endswith("every token") else fps,
+                                      target=target, clock=lambda: now[0])
+        start = time.perf_counter()
+        for piece in pieces:
+            now[0] += 1.0 / rate  # Virtual clock, so the frame cap behaves as at the real rate
+            if renderer is None:
+                target.print(piece, end="", style="cyan")  # What the session did before the renderer
+            else:
+                renderer.write(piece)
+        if renderer is not None:
+            renderer.close()
+        elapsed = time.perf_counter() - start
+        return {
+            "mode": mode,
+            "us_per_token": elapsed / len(pieces) * 1e6,
+            "frames": renderer.frames if renderer is not None and not renderer.plain else len(pieces),
+            "bytes": len(target.file.getvalue().encode('utf-8')),
+        }
+
+    results = [
+        measure("per-chunk print", True),
+        measure("coalesced", True),
+        measure("markdown every token", True),
+        measure("markdown", True),
+        measure("not a TTY", False),
+    ]
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Mode", style="cyan")
+    table.add_column("µs/token", justify="right")
+    table.add_column("Writes", justify="right")
+    table.add_column("Bytes written", justify="right")
+    for result in results:
+        table.add_row(result["mode"], f"{result['us_per_token']:.1f}", str(result["frames"]), str(result["bytes"]))
+        emit_metrics("render_bench", tokens=len(pieces), rate=rate, fps=fps, **result)
+    console.print(f"🖥️ [bold]Render overhead ({len(pieces)} tokens at {rate:g} tok/s, {fps} fps cap):[/bold]")
+    console.print(table)
+    return 0
+
+def run_benchmark(models=None, num_ctxs=(NUM_CTX,), num_threads=(None,), prompt_names=tuple(BENCH_PROMPTS),
+                  max_tokens=BENCH_MAX_TOKENS, output=None, compare=None, threshold=BENCH_REGRESSION_PCT,
+                  repeats=BENCH_REPEATS):
+    """Run the prompt set over every model x num_ctx x num_thread combination and write a JSON report.
+
+    Each prompt runs repeats times and the report keeps the median of each metric.
+    """
+    import psutil
+    from rich.table import Table
+
+    if not models:
+        try:
+            models = [m.get('model') for m in installed_models(pooled=False)]
+        except Exception as e:
+            console.print(f"❌ [red]Error listing models: {str(e)}[/red]")
+            return 1
+    if not models:
+        console.print("ℹ️ [yellow]No models installed. Use 'delta pull <model>' to download one.[/yellow]")
+        return 1
+
+    report = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
+        "host": {
+            "cpu_count": psutil.cpu_count(logical=True),
+            "ram_gb": round(psutil.virtual_memory().total / 1e9, 1),
+            "platform": sys.platform,
+        },
+        "max_tokens": max_tokens,
+        "repeats": repeats,
+        "results": [],
+    }
+    for model_name in models:
+        for num_ctx in num_ctxs:
+            for num_thread in num_threads:
+                label = f"{model_name} ctx={num_ctx} threads={num_thread or 'auto'}"
+                try:
+                    # Warm-up: pays the (re)load for this configuration outside the measurements
+                    with console.status(f"Loading {label}..."):
+                        warm = bench_once(model_name, "Hi", num_ctx, num_thread, 1)
+                    for prompt_name in prompt_names:
+                        samples = []
+                        for run in range(1, repeats + 1):
+                            with console.status(f"Benchmarking {label} prompt={prompt_name} ({run}/{repeats})..."):
+                                samples.append(bench_once(model_name, bench_prompt(prompt_name), num_ctx, num_thread, max_tokens))
+                        metrics = median_metrics(samples)
+                        report["results"].append({
+                            "model": model_name, "num_ctx": num_ctx, "num_thread": num_thread,
+                            "prompt": prompt_name, "warmup_load_s": warm["load_s"], **metrics,
+                        })
+                        emit_metrics("bench", **report["results"][-1])
+                except Exception as e:
+                    console.print(f"❌ [red]{label}: {str(e)}[/red]")
+    if not report["results"]:
+        console.print("❌ [red]Every benchmark run failed; no report written.[/red]")
+        return 1
+
+    def fmt(value, spec, unit=""):
+        return format(value, spec) + unit if value is not None else "N/A"
+
+    table = Table(show_header=True, header_style="bold magenta")
+    for column in ["Model", "Ctx", "Threads", "Prompt", "TTFT", "Prefill tok/s", "Decode tok/s", "Peak RSS", "CPU"]:
+        table.add_column(column, justify="left" if column in ("Model", "Prompt") else "right")
+    for r in report["results"]:
+        table.add_row(
+            r["model"], str(r["num_ctx"]), str(r["num_thread"] or "auto"), r["prompt"],
+            fmt(r["ttft_s"], ".2f", "s"), fmt(r["prefill_tok_s"], ".0f"), fmt(r["decode_tok_s"], ".1f"),
+            fmt(r["peak_rss_mb"], ".0f", " MB"), fmt(r["cpu_util_pct"], ".0f", "%"),
+        )
+    console.print("🏁 [bold]Benchmark:[/bold]")
+    console.print(table)
+
+    if output is None:
+        BENCH_DIR.mkdir(parents=True, exist_ok=True)
+        output = BENCH_DIR / time.strftime("bench-%Y%m%d-%H%M%S.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    console.print(f"💾 Report written to {output}")
+
+    if compare:
+        with open(compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        regressions = compare_bench_reports(previous, report, threshold)
+        if not regressions:
+            console.print(f"✅ [green]No regressions beyond {threshold:g}% against {compare}[/green]")
+            return 0
+        console.print(f"❌ [red]{len(regressions)} regression(s) beyond {threshold:g}% against {compare}:[/red]")
+        for (model_name, num_ctx, num_thread, prompt_name), metric, before, after, change in regressions:
+            console.print(f"  [red]{model_name} ctx={num_ctx} threads={num_thread or 'auto'} {prompt_name}: {metric} {before:.2f} → {after:.2f} ({change:+.0f}%)[/red]")
+        return 1
+    return 0
+
+# Startup profiling
+STARTUP_BUDGET_MS = 1000  # Import-time budget for 'delta list' (the ollama client alone is ~500 ms)
+
+def profile_startup(argv, budget_ms=STARTUP_BUDGET_MS, top=15):
+    """Re-run delta with -X importtime and report the slowest imports; returns 1 if over budget."""
+    from rich.table import Table
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", os.path.abspath(__file__)] + argv, stderr=subprocess.PIPE, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    imports, other = [], []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            other.append(line)
+            continue
+        _, cumulative_us, name = line.split("|")
+        name = name[1:]
+        if cumulative_us.strip().isdigit() and not name.startswith(" "):  # Nested imports are indented
+            imports.append((name, int(cumulative_us) / 1000))
+    if other:
+        print("\n".join(other), file=sys.stderr)
+
+    total_ms = sum(ms for _, ms in imports)
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Module", style="cyan")
+    table.add_column("Import time", justify="right")
+    for name, ms in sorted(imports, key=lambda item: item[1], reverse=True)[:top]:
+        table.add_row(name, f"{ms:.1f} ms")
+    console.print(f"⏱️ [bold]Startup profile for 'delta {' '.join(argv)}':[/bold]")
+    console.print(table)
+    console.print(f"Imports: {total_ms:.0f} ms across {len(imports)} top-level modules, wall time: {wall_ms:.0f} ms")
+    if total_ms > budget_ms:
+        console.print(f"❌ [red]Import time exceeds the {budget_ms} ms budget.[/red]")
+        return 1
+    console.print(f"✅ [green]Within the {budget_ms} ms import budget.[/green]")
+    return result.returncode
+
 def main():
     """Parse arguments and execute commands.""" 
+    # Handled before the real parser so that '--startup-profile --version' profiles instead of exiting
+    profile_parser = argparse.ArgumentParser(add_help=False)
+    profile_parser.add_argument("--startup-profile", action="store_true")
+    profile_parser.add_argument("--startup-budget", type=int, default=STARTUP_BUDGET_MS)
+    profile_args, argv = profile_parser.parse_known_args()
+    if profile_args.startup_profile:
+        sys.exit(profile_startup(argv, profile_args.startup_budget))
+
     custom_help_message = """Delta CLI:
         A local Inferencing tool, brings powerful language models to your CPU.
 
@@ -814,20 +3752,37 @@ Usage:
 
 Available Commands:
         run                    Run model with [Flags]
+        batch                  Answer a JSON lines file of prompts (--input, --output, --concurrency)
         list                   List models
         pull                   Download model
         remove                 Remove model
+        hosts                  Show the Ollama hosts in ~/.delta/hosts.toml and their models
         hist                   Display or clear chat history
         check                  Check hardware capabilities for running LLMs
+        bench                  Benchmark models (TTFT, prefill/decode tok/s, RSS, CPU)
+        index                  Build or watch (re-index on change) a document folder
+        cache                  Show or clear the retrieval cache
 
 Available Flags:
         --wiki                 Searching Wikipedia
         --ddg                  Searching DuckDuckGo
         --arxiv                Search arXiv paper
-        --docs                 Searching through local documents
+        --docs                 Searching through local documents (files, folders or globs)
+        --embed                Add semantic search to --docs using local embeddings
         --think                Allow delta to take some time to think
+        --context-timeout      Latency budget for context sources, e.g. 1.5s
+        --num-ctx              Context window in tokens (default 2048)
+        --keep-alive           Keep the model loaded between questions (default 30m, -1 forever)
+        --markdown             Render answers as live Markdown (--fps caps repaints, default 30)
+        --metrics              Write per-turn metrics to a JSON lines file
         --clear                Clear all the history
+        --search               Search the history (with --limit, --page, --since)
         --version              Show Delta version
+        --ollama-host          Ollama server URL, before the command: delta --ollama-host http://pc:11434 run llama3.1
+        --connect-timeout      Ollama connect timeout (default 5s); --read-timeout (default 300s)
+        --retries              Retries for transient Ollama errors (default 2)
+        --startup-profile      Report import time per module for a command, e.g. delta --startup-profile list
+                               (exits 1 if imports exceed --startup-budget ms, default 1000)
         --help/-h              help for delta"""
 
     # Define the custom action
@@ -845,6 +3800,12 @@ Available Flags:
     # Add --version flag
     parser.add_argument("--version", action="version", version="delta v2.0")
 
+    # Ollama connection settings, shared by every command
+    parser.add_argument("--ollama-host", help="Ollama server URL (default: $OLLAMA_HOST or http://127.0.0.1:11434)")
+    parser.add_argument("--connect-timeout", type=parse_duration, default=OLLAMA_CONNECT_TIMEOUT, help="Connect timeout, e.g. 5s")
+    parser.add_argument("--read-timeout", type=parse_duration, default=OLLAMA_READ_TIMEOUT, help="Read timeout, e.g. 300s")
+    parser.add_argument("--retries", type=int, default=OLLAMA_RETRIES, help="Retries for transient Ollama errors")
+
     # Add subparsers for commands
     subparsers = parser.add_subparsers(dest="command")
 
@@ -854,19 +3815,68 @@ Available Flags:
     run_parser.add_argument("--wiki", action="store_true", help="Search Wikipedia")
     run_parser.add_argument("--arxiv", action="store_true", help="Search arXiv")
     run_parser.add_argument("--ddg", action="store_true", help="Search DuckDuckGo for current information")
-    run_parser.add_argument("--docs", help="Path to a document file (.txt, .pdf, .docx)")
+    run_parser.add_argument("--docs", nargs="+", help="Document files, directories or glob patterns (.txt, .pdf, .docx)")
     run_parser.add_argument("--think", action="store_true", help="Include thinking step to analyze the question")
-
-    subparsers.add_parser("list", help="List models")
+    run_parser.add_argument("--metrics", metavar="FILE", help="Append per-turn latency/throughput metrics to FILE as JSON lines")
+    run_parser.add_argument("--num-ctx", type=int, default=NUM_CTX, help=f"Context window in tokens (default {NUM_CTX})")
+    run_parser.add_argument("--embed", nargs="?", const=EMBED_MODEL, metavar="MODEL", help=f"Also rank --docs passages semantically with an Ollama embedding model (default {EMBED_MODEL})")
+    run_parser.add_argument("--keep-alive", type=parse_keep_alive, default=KEEP_ALIVE, help="How long Ollama keeps the model loaded between questions, e.g. 30m, 1h, -1 (forever)")
+    run_parser.add_argument("--markdown", action="store_true", help="Render answers as live Markdown")
+    run_parser.add_argument("--fps", type=int, default=RENDER_FPS, help=f"Maximum repaints per second while streaming (default {RENDER_FPS})")
+    run_parser.add_argument("--context-timeout", type=parse_duration, default=CONTEXT_TIMEOUT, help="Latency budget for fetching context, e.g. 1.5s (sources can be combined)")
+
+    batch_parser = subparsers.add_parser("batch", help="Answer a JSON-lines file of prompts without the interactive session")
+    batch_parser.add_argument("model", help="Model name")
+    batch_parser.add_argument("--input", required=True, help="JSON lines with {\"id\": ..., \"prompt\": ...} per line")
+    batch_parser.add_argument("--output", required=True, help="JSON lines file to append answers to (resumes from completed ids)")
+    batch_parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help=f"Requests in flight at once (default {BATCH_CONCURRENCY})")
+    batch_parser.add_argument("--ordered", action="store_true", help="Write answers in input order instead of as they finish")
+    batch_parser.add_argument("--wiki", action="store_true", help="Search Wikipedia")
+    batch_parser.add_argument("--arxiv", action="store_true", help="Search arXiv")
+    batch_parser.add_argument("--ddg", action="store_true", help="Search DuckDuckGo for current information")
+    batch_parser.add_argument("--docs", nargs="+", help="Document files, directories or glob patterns (.txt, .pdf, .docx)")
+    batch_parser.add_argument("--embed", nargs="?", const=EMBED_MODEL, metavar="MODEL", help="Also rank --docs passages semantically")
+    batch_parser.add_argument("--context-timeout", type=parse_duration, default=CONTEXT_TIMEOUT, help="Latency budget for fetching context")
+    batch_parser.add_argument("--num-ctx", type=int, default=NUM_CTX, help=f"Context window in tokens (default {NUM_CTX})")
+    batch_parser.add_argument("--metrics", metavar="FILE", help="Append batch metrics to FILE as JSON lines")
+
+    list_parser = subparsers.add_parser("list", help="List models")
+    list_parser.add_argument("--refresh", action="store_true", help="Ask the Ollama server instead of using the cached model list")
     pull_parser = subparsers.add_parser("pull", help="Download model")
     pull_parser.add_argument("model", help="Model name")
+    pull_parser.add_argument("--host", help="Only this host from hosts.toml (default: all healthy hosts)")
     remove_parser = subparsers.add_parser("remove", help="Remove model")
     remove_parser.add_argument("model", help="Model name")
+    remove_parser.add_argument("--host", help="Only this host from hosts.toml (default: every host that has it)")
+    subparsers.add_parser("hosts", help="Show the health and models of the hosts in ~/.delta/hosts.toml")
     subparsers.add_parser("setup", help="Set up Delta CLI with virtual environment for easy execution")
     
     hist_parser = subparsers.add_parser("hist", help="Display or clear chat history")
     hist_parser.add_argument("--clear", action="store_true", help="Clear chat history")
+    hist_parser.add_argument("--search", help="Full-text search over past questions and answers")
+    hist_parser.add_argument("--limit", type=int, help="Number of entries per page")
+    hist_parser.add_argument("--page", type=int, default=1, help="Page number to show (with --limit)")
+    hist_parser.add_argument("--since", type=parse_since, help="Only entries on or after this date (YYYY-MM-DD)")
     check_parser = subparsers.add_parser("check", help="Check hardware capabilities for running LLMs")
+    bench_parser = subparsers.add_parser("bench", help="Benchmark installed models across settings")
+    bench_parser.add_argument("models", nargs="*", help="Models to benchmark (default: all installed)")
+    bench_parser.add_argument("--num-ctx", type=int, nargs="+", default=[NUM_CTX], help="Context sizes to test")
+    bench_parser.add_argument("--num-thread", type=int, nargs="+", default=[None], help="Thread counts to test (default: Ollama's choice)")
+    bench_parser.add_argument("--prompts", nargs="+", choices=list(BENCH_PROMPTS), default=list(BENCH_PROMPTS), help="Prompt lengths to test")
+    bench_parser.add_argument("--max-tokens", type=int, default=BENCH_MAX_TOKENS, help="Tokens to generate per run")
+    bench_parser.add_argument("--repeats", type=int, default=BENCH_REPEATS, help="Runs per prompt; the median is reported")
+    bench_parser.add_argument("--output", help="Report file (default: ~/.delta/bench/bench-<time>.json)")
+    bench_parser.add_argument("--compare", help="Previous report to check for regressions")
+    bench_parser.add_argument("--threshold", type=float, default=BENCH_REGRESSION_PCT, help="Regression threshold in percent")
+    bench_parser.add_argument("--render", action="store_true", help="Measure streaming render overhead per token instead of models")
+    bench_parser.add_argument("--fps", type=int, default=RENDER_FPS, help="Repaint cap for --render")
+    bench_parser.add_argument("--metrics", metavar="FILE", help="Append each result to FILE as JSON lines")
+    index_parser = subparsers.add_parser("index", help="Build or watch the document index for a folder")
+    index_parser.add_argument("action", choices=["build", "watch"], help="'build' once, or 'watch' for changes")
+    index_parser.add_argument("path", help="Folder of .txt, .pdf and .docx files")
+    index_parser.add_argument("--interval", type=parse_duration, default=WATCH_INTERVAL, help="Polling interval for watch, e.g. 2s")
+    cache_parser = subparsers.add_parser("cache", help="Show or clear the retrieval cache")
+    cache_parser.add_argument("--clear", action="store_true", help="Clear the retrieval cache")
 
     # Parse arguments
     args = parser.parse_args()
@@ -876,29 +3886,53 @@ Available Flags:
         print(custom_help_message)
         sys.exit(0) 
     
+    if getattr(args, "metrics", None):
+        add_jsonl_metrics_sink(args.metrics)
+    configure_ollama_client(host=args.ollama_host, connect_timeout=args.connect_timeout,
+                            read_timeout=args.read_timeout, retries=max(0, args.retries))
+
     if args.command == "run":
         if not is_model_available(args.model):
             console.print(f"❌ [red]Sorry, this model '{args.model}' is not yet downloaded, Please check available models with 'delta list' or download a new model'.[/red]")
         else:
-            if sum([args.wiki, args.arxiv, args.ddg, bool(args.docs)]) > 1:
-                console.print("❌ [red]Use only one: --wiki, --arxiv, --ddg, or --docs[/red]")
-            else:
-                run_model(args.model, use_wiki=args.wiki, use_arxiv=args.arxiv, use_ddg=args.ddg, doc_path=args.docs, use_think=args.think)
+            run_model(args.model, use_wiki=args.wiki, use_arxiv=args.arxiv, use_ddg=args.ddg, doc_path=args.docs, use_think=args.think, context_timeout=args.context_timeout, embed_model=args.embed, num_ctx=args.num_ctx, keep_alive=args.keep_alive, markdown=args.markdown, fps=args.fps)
+    elif args.command == "batch":
+        if not is_model_available(args.model):
+            console.print(f"❌ [red]Sorry, this model '{args.model}' is not yet downloaded, Please check available models with 'delta list' or download a new model'.[/red]")
+        else:
+            run_batch(args.model, args.input, args.output, concurrency=max(1, args.concurrency), ordered=args.ordered,
+                      use_wiki=args.wiki, use_arxiv=args.arxiv, use_ddg=args.ddg, doc_path=args.docs,
+                      context_timeout=args.context_timeout, embed_model=args.embed, num_ctx=args.num_ctx)
     elif args.command == "list":
-        list_models()
+        list_models(args.refresh)
     elif args.command == "pull":
-        pull_model(args.model)
+        pull_model(args.model, host=args.host)
     elif args.command == "remove":
-        remove_model(args.model)
+        remove_model(args.model, host=args.host)
+    elif args.command == "hosts":
+        display_hosts()
     elif args.command == "setup":
         setup_delta()
     elif args.command == "hist":
         if args.clear:
             clear_history()
         else:
-            display_history()
+            display_history(search=args.search, limit=args.limit, since=args.since, page=max(args.page, 1))
     elif args.command == "check":
         check_hardware()
+    elif args.command == "bench" and args.render:
+        sys.exit(run_render_benchmark(fps=args.fps))
+    elif args.command == "bench":
+        sys.exit(run_benchmark(args.models, num_ctxs=args.num_ctx, num_threads=args.num_thread, prompt_names=args.prompts,
+                               max_tokens=args.max_tokens, output=args.output, compare=args.compare, threshold=args.threshold,
+                               repeats=max(1, args.repeats)))
+    elif args.command == "index":
+        watch_documents(args.path, interval=args.interval, once=args.action == "build")
+    elif args.command == "cache":
+        if args.clear:
+            clear_retrieval_cache()
+        else:
+            display_cache_stats()
     else:
         parser.print_help()
 
@@ -0,0 +1,19 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def delta(tmp_path, monkeypatch):
+    """delta.py loaded fresh, with its ~/.delta state under a temporary home."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("USERPROFILE", str(tmp_path))
+    spec = importlib.util.spec_from_file_location("delta_cli", ROOT / "delta.py")
+    module = importlib.util.module_from_spec(spec)
+    monkeypatch.setitem(sys.modules, "delta_cli", module)  # Lets worker processes unpickle its functions
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,65 @@
+import json
+
+
+class FakeClient:
+    def __init__(self):
+        self.prompts = []
+
+    def chat(self, model, messages, options):
+        self.prompts.append(messages[-1]["content"])
+        return {"message": {"content": "answer"}, "eval_count": 1}
+
+
+def setup(delta, monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(delta, "get_ollama_client", lambda: client)
+    monkeypatch.setattr(delta, "get_host_pool", lambda: None)
+    return client
+
+
+def read_output(path):
+    records = []
+    for line in path.read_text().splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records
+
+
+def test_resume_after_torn_output_line(delta, tmp_path, monkeypatch):
+    setup(delta, monkeypatch)
+    inputs = tmp_path / "in.jsonl"
+    inputs.write_text("".join(json.dumps({"id": i, "prompt": f"q{i}"}) + "\n" for i in range(3)))
+    output = tmp_path / "out.jsonl"
+    output.write_text(json.dumps({"id": "0", "prompt": "q0", "response": "answer"}) + "\n" + '{"id": "1", "pro')
+
+    delta.run_batch("m", inputs, output, concurrency=1, ordered=True)
+
+    assert [r["id"] for r in read_output(output)] == ["0", "1", "2"]
+    delta.run_batch("m", inputs, output, concurrency=1, ordered=True)
+    assert [r["id"] for r in read_output(output)] == ["0", "1", "2"]
+
+
+def test_duplicate_ids_answered_once(delta, tmp_path, monkeypatch):
+    client = setup(delta, monkeypatch)
+    inputs = tmp_path / "in.jsonl"
+    inputs.write_text("".join(json.dumps({"id": i, "prompt": f"q{n}"}) + "\n" for n, i in enumerate(["a", "b", "a"])))
+    output = tmp_path / "out.jsonl"
+
+    delta.run_batch("m", inputs, output, concurrency=1, ordered=True)
+
+    assert [r["id"] for r in read_output(output)] == ["a", "b"]
+    assert len(client.prompts) == 2
+
+
+def test_batch_context_fits_num_ctx(delta, tmp_path, monkeypatch):
+    client = setup(delta, monkeypatch)
+    context = " ".join(f"word{i}" for i in range(20000))
+    monkeypatch.setattr(delta, "get_context", lambda *args, **kwargs: (context, ["source"], [], ""))
+
+    record = delta.answer_batch_item("m", "1", "question?", True, False, False, None, 1.0, None, 2048)
+
+    assert "error" not in record
+    window = delta.ConversationWindow(2048)
+    assert delta.estimate_tokens(client.prompts[0]) + delta.PROMPT_OVERHEAD <= window.budget
@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+import time
+
+from conftest import ROOT
+
+HUNG_SOURCE = f"""
+import importlib.util, threading
+spec = importlib.util.spec_from_file_location("delta_cli", {str(ROOT / "delta.py")!r})
+delta = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(delta)
+delta.fetch_arxiv_context = lambda query: threading.Event().wait()  # Never answers
+print(delta.get_context("query", use_arxiv=True, timeout=0.2))
+"""
+
+
+def test_hung_source_does_not_block_exit(tmp_path):
+    env = {**os.environ, "HOME": str(tmp_path), "USERPROFILE": str(tmp_path)}
+    started = time.monotonic()
+    result = subprocess.run([sys.executable, "-c", HUNG_SOURCE], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert "('', [], [], '')" in result.stdout
+    assert time.monotonic() - started < 30
@@ -0,0 +1,22 @@
+def long_text(words, word="lorem"):
+    return " ".join(f"{word}{i}." for i in range(words))
+
+
+def test_request_never_exceeds_budget_after_folding(delta):
+    window = delta.ConversationWindow(num_ctx=1024, reserve=512)
+    context = long_text(2000, "context")
+    for turn in range(12):
+        question = f"question {turn} " + long_text(20, "q")
+        window.messages_for(window.prompt_for(question, context))
+        assert window.last_request_tokens <= window.budget, turn
+        window.add_turn(question, long_text(150, "answer"))
+
+
+def test_small_context_keeps_recent_turns(delta):
+    window = delta.ConversationWindow(num_ctx=4096, reserve=512)
+    window.add_turn("first question", "first answer.")
+    prompt = window.prompt_for("next question", "short context")
+    assert prompt == delta.build_prompt("next question", "short context")
+    window.messages_for(prompt)
+    assert window.turns == [("first question", "first answer.")]
+    assert not window.summary_lines
@@ -0,0 +1,196 @@
+import os
+from pathlib import Path
+
+import pytest
+
+
+def write_docs(directory, count=3):
+    directory.mkdir()
+    for i in range(count):
+        (directory / f"doc{i}.txt").write_text(f"document {i} about topic {i}\n" * 20)
+
+
+def blobs(delta):
+    return sorted(delta.DOCUMENT_CACHE_DIR.glob("*.json.z"))
+
+
+def test_watch_drops_blob_of_replaced_version(delta, tmp_path):
+    docs = tmp_path / "docs"
+    write_docs(docs)
+    delta.watch_documents(docs, once=True)
+    assert len(blobs(delta)) == 3
+
+    edited = docs / "doc0.txt"
+    edited.write_text("rewritten content\n" * 20)
+    os.utime(edited, (1, 1))
+    delta.watch_documents(docs, once=True)
+    assert len(blobs(delta)) == 3
+
+
+def test_blob_shared_by_copies_survives_one_edit(delta, tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for name in ("a.txt", "b.txt"):
+        (docs / name).write_text("same text\n" * 20)
+    delta.watch_documents(docs, once=True)
+    assert len(blobs(delta)) == 1
+
+    (docs / "a.txt").write_text("different text\n" * 20)
+    os.utime(docs / "a.txt", (1, 1))
+    delta.watch_documents(docs, once=True)
+    assert len(blobs(delta)) == 2
+    assert delta.load_cached_document(delta.document_signature((docs / "b.txt").resolve())) is not None
+
+
+def test_store_skips_file_deleted_after_extraction(delta, tmp_path):
+    path = tmp_path / "gone.txt"
+    path.write_text("text\n")
+    signature = delta.document_signature(path)
+    path.unlink()
+    with pytest.raises(OSError):
+        delta.store_cached_document(signature, ["text"], [1], 1)
+
+
+def test_store_refuses_file_replaced_after_extraction(delta, tmp_path):
+    path = tmp_path / "doc.txt"
+    path.write_text("old text\n")
+    signature = delta.document_signature(path)
+    path.write_text("new and longer text\n")
+    assert delta.store_cached_document(signature, ["old text"], [1], 1) is False
+    assert blobs(delta) == []
+
+
+def test_vector_index_embeds_only_new_passages(delta, monkeypatch):
+    import numpy as np
+
+    embedded = []
+
+    def fake_embed(model, texts):
+        texts = list(texts)
+        embedded.extend(texts)
+        vectors = np.array([[len(t), t.count("a") + 1, 1.0] for t in texts], dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    monkeypatch.setattr(delta, "embed_texts", fake_embed)
+    passages = [f"passage {i} " + "a" * i for i in range(10)]
+    index = delta.BM25Index(passages, ["doc.txt"] * 10, list(range(10)))
+    first = delta.VectorIndex.build(index, "embedder", batch_size=4)
+    assert len(embedded) == 10
+
+    embedded.clear()
+    edited = passages[:9] + ["brand new passage"]
+    second = delta.VectorIndex.build(delta.BM25Index(edited, ["doc.txt"] * 10, list(range(10))), "embedder")
+    assert embedded == ["brand new passage"]
+    assert second.directory == first.directory
+    assert list(second.rows[:9]) == list(first.rows[:9])
+    assert second.search("brand new passage", k=1) == [9]
+
+
+def test_vector_index_removes_legacy_corpus_directories(delta, monkeypatch):
+    import numpy as np
+
+    monkeypatch.setattr(delta, "embed_texts", lambda model, texts: np.ones((len(list(texts)), 2), dtype=np.float32))
+    legacy = delta.VECTOR_INDEX_DIR / ("0" * 32)
+    legacy.mkdir(parents=True)
+    (legacy / "chunks.sqlite3").write_bytes(b"")
+    delta.VectorIndex.build(delta.BM25Index(["one passage"], ["doc.txt"], [1]), "embedder")
+    assert not legacy.exists()
+
+
+def test_folder_is_listed_once_per_session(delta, tmp_path, monkeypatch):
+    docs = tmp_path / "docs"
+    write_docs(docs, count=2)
+    calls = []
+    resolve = delta.resolve_document_paths
+    monkeypatch.setattr(delta, "resolve_document_paths", lambda specs: calls.append(specs) or resolve(specs))
+
+    delta.fetch_document_context(str(docs), "topic 1")
+    delta.fetch_document_context(str(docs), "topic 0")
+    assert len(calls) == 1
+
+    (docs / "doc1.txt").unlink()
+    context = delta.fetch_document_context(str(docs), "topic 0")[0]
+    assert "document 0" in context
+
+
+def test_failed_read_is_retried(delta, tmp_path, monkeypatch):
+    docs = tmp_path / "docs"
+    write_docs(docs, count=1)
+    path = (docs / "doc0.txt").resolve()
+    failures = [path]
+
+    def flaky_open(file, mode='r', *args, **kwargs):
+        if failures and Path(file) == failures[0] and mode == 'r':  # The text reader, not the hashing
+            failures.pop()
+            raise PermissionError(13, "Permission denied", str(file))
+        return open(file, mode, *args, **kwargs)
+
+    monkeypatch.setattr(delta, "open", flaky_open, raising=False)  # Seen by iter_text_file
+    assert delta.build_document_index([path]).passages == []
+    assert delta.build_document_index([path]).passages
+
+
+def test_corrupt_pdf_is_not_cached_as_empty(delta, tmp_path):
+    path = tmp_path / "broken.pdf"
+    path.write_bytes(b"%PDF-1.4 this is not really a pdf")
+    with pytest.raises(Exception):
+        delta.extract_document(str(path))
+    assert delta.build_document_index([path.resolve()]).passages == []
+    assert not delta._document_indexes
+    assert not delta._extracted_chunks
+
+
+def record_reads(delta, monkeypatch):
+    reads = []
+    iter_document = delta.iter_document
+    monkeypatch.setattr(delta, "iter_document", lambda path: reads.append(Path(path).name) or iter_document(path))
+    return reads
+
+
+def test_scan_stops_once_budget_is_met(delta, tmp_path, monkeypatch):
+    docs = tmp_path / "docs"
+    write_docs(docs)
+    reads = record_reads(delta, monkeypatch)
+    found = delta.scan_documents(sorted(docs.iterdir()), "document topic", token_budget=100)
+    assert reads == ["doc0.txt"]
+    assert [Path(source).name for _, source, _ in found] == ["doc0.txt"]
+
+
+def test_scan_ranks_partial_matches_when_budget_is_not_met(delta, tmp_path, monkeypatch):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "a.txt").write_text("apples only\n" * 20)
+    (docs / "b.txt").write_text("unrelated words\n" * 20)
+    (docs / "c.txt").write_text("apples and pears\n" * 20)
+    reads = record_reads(delta, monkeypatch)
+    found = delta.scan_documents(sorted(docs.iterdir()), "apples pears")
+    assert reads == ["a.txt", "b.txt", "c.txt"]
+    assert [(Path(source).name, location) for _, source, location in found] == [("c.txt", 1), ("a.txt", 1)]
+
+
+def test_scan_skips_unreadable_file(delta, tmp_path):
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"%PDF-1.4 this is not really a pdf")
+    good = tmp_path / "good.txt"
+    good.write_text("apples and pears\n" * 20)
+    found = delta.scan_documents([broken, good], "pears")
+    assert [Path(source).name for _, source, _ in found] == ["good.txt"]
+
+
+def test_question_streams_files_while_index_builds(delta, tmp_path, monkeypatch):
+    docs = tmp_path / "docs"
+    write_docs(docs)
+    scans = []
+    scan = delta.scan_documents
+    monkeypatch.setattr(delta, "scan_documents", lambda paths, query: scans.append(query) or scan(paths, query))
+
+    with delta._document_index_lock:  # A background build is running
+        context = delta.fetch_document_context(str(docs), "topic 1")[0]
+    assert scans == ["topic 1"]
+    assert "Document: doc1.txt" in context
+
+    delta.fetch_document_context(str(docs))
+    with delta._document_index_lock:  # Finished indexes are used without waiting for the lock
+        context = delta.fetch_document_context(str(docs), "topic 2")[0]
+    assert scans == ["topic 1"]
+    assert "Document: doc2.txt" in context
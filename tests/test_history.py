@@ -0,0 +1,80 @@
+def test_append_after_torn_line_keeps_new_record(delta):
+    delta.save_interaction("first", "one")
+    delta.save_interaction("second", "two")
+    segment = delta.history_segments()[-1]
+
+    # Simulate a crash halfway through writing the second record
+    data = segment.read_bytes()
+    segment.write_bytes(data[:len(data) - 10])
+
+    delta.save_interaction("third", "three")
+
+    inputs = [record["user_input"] for record in delta.iter_history()]
+    assert inputs == ["first", "third"]
+
+
+def test_search_index_sees_record_after_torn_line(delta):
+    delta.save_interaction("alpha", "one")
+    segment = delta.history_segments()[-1]
+    segment.write_bytes(segment.read_bytes() + b'{"timestamp": "2024')
+
+    delta.save_interaction("bravo", "two")
+
+    conn = delta.open_history_index()
+    try:
+        delta.sync_history_index(conn)
+        rows = [row[0] for row in conn.execute("SELECT user_input FROM interactions ORDER BY id")]
+    finally:
+        conn.close()
+    assert rows == ["alpha", "bravo"]
+
+
+def test_concurrent_syncs_index_each_line_once(delta, monkeypatch):
+    import threading
+    import time
+
+    delta.HISTORY_DIR.mkdir(parents=True)
+    delta._append_history_records([delta.make_interaction("hello", "world")])
+
+    first_inside = threading.Event()
+    real_segments = delta.history_segments
+
+    def slow_segments():
+        if not first_inside.is_set():
+            first_inside.set()
+            time.sleep(0.5)  # Hold the first sync open while the second one starts
+        return real_segments()
+
+    monkeypatch.setattr(delta, "history_segments", slow_segments)
+
+    def sync():
+        conn = delta.open_history_index()
+        try:
+            delta.sync_history_index(conn)
+        finally:
+            conn.close()
+
+    first = threading.Thread(target=sync)
+    first.start()
+    first_inside.wait(5)
+    second = threading.Thread(target=sync)
+    second.start()
+    first.join()
+    second.join()
+
+    monkeypatch.setattr(delta, "history_segments", real_segments)
+    assert [row[1] for row in delta.search_history("hello")] == ["hello"]
+
+
+def test_blank_search_is_rejected(delta, capsys):
+    delta.save_interaction("hello", "world")
+    delta.display_history(search="   ")
+    assert "needs at least one word" in capsys.readouterr().out
+
+
+def test_full_search_page_hints_at_next_page(delta, capsys):
+    delta.write_interactions([delta.make_interaction(f"hello {i}", "world") for i in range(25)])
+    delta.display_history(search="hello")
+    assert "--page 2" in capsys.readouterr().out
+    delta.display_history(search="hello", page=2)
+    assert "--page 3" not in capsys.readouterr().out
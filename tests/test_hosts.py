@@ -0,0 +1,146 @@
+import asyncio
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class StandIn:
+    """A minimal Ollama server on an ephemeral port: /api/tags, /api/chat and /api/embed.
+
+    With die_mid_stream, a streamed chat sends one chunk and then drops the connection.
+    """
+
+    def __init__(self, name, die_mid_stream=False):
+        self.name = name
+        self.die_mid_stream = die_mid_stream
+        self.requests = 0
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, value):
+                body = json.dumps(value).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _chunk(self, value):
+                data = json.dumps(value).encode() + b"\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._json({"models": [{"model": "m:latest", "name": "m:latest", "size": 1, "digest": "d"}]})
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                stand_in.requests += 1
+                if self.path == "/api/embed":
+                    self._json({"model": request["model"], "embeddings": [[1.0, 0.0] for _ in request["input"]]})
+                    return
+                message = {"role": "assistant", "content": f"from {stand_in.name}"}
+                final = {"model": request["model"], "created_at": "2026-01-01T00:00:00Z", "done": True, "eval_count": 1}
+                if not request.get("stream", True):
+                    self._json({**final, "message": message})
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                self._chunk({"model": request["model"], "created_at": "2026-01-01T00:00:00Z", "done": False, "message": message})
+                if stand_in.die_mid_stream:
+                    self.close_connection = True
+                    self.connection.shutdown(socket.SHUT_RDWR)
+                    return
+                self._chunk({**final, "message": {"role": "assistant", "content": ""}})
+                self.wfile.write(b"0\r\n\r\n")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stand_ins():
+    servers = []
+
+    def start(name, **kwargs):
+        server = StandIn(name, **kwargs)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def closed_port_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+def make_pool(delta, *servers):
+    return delta.HostPool([delta.Host(server.name, server.url) for server in servers])
+
+
+def test_down_host_is_marked_unhealthy(delta, stand_ins):
+    up = stand_ins("up")
+    pool = delta.HostPool([delta.Host("up", up.url), delta.Host("down", closed_port_url())])
+    healthy = pool.check()
+    assert [host.name for host in healthy] == ["up"]
+    assert not pool.hosts[1].healthy
+    assert pool.has_model("m")
+
+
+def test_request_goes_to_least_loaded_host(delta, stand_ins):
+    a, b = stand_ins("a"), stand_ins("b")
+    pool = make_pool(delta, a, b)
+    pool.check()
+    with pool.acquire("m") as busy:
+        response = pool.request("m", "chat", messages=[{"role": "user", "content": "hi"}])
+    idle = "b" if busy.name == "a" else "a"
+    assert response["message"]["content"] == f"from {idle}"
+    assert {host.name: host.in_flight for host in pool.hosts} == {"a": 0, "b": 0}
+
+
+def test_mid_stream_failover_completes_on_other_host(delta, stand_ins):
+    dying, healthy = stand_ins("dying", die_mid_stream=True), stand_ins("healthy")
+    pool = make_pool(delta, dying, healthy)
+    pool.check()
+    pool.hosts[0].latency, pool.hosts[1].latency = 0.0, 1.0  # Route to the dying host first
+
+    async def collect():
+        return [chunk async for chunk in pool.astream("m", "chat", messages=[{"role": "user", "content": "hi"}])]
+
+    chunks = asyncio.run(collect())
+    assert chunks[0]["message"]["content"] == "from dying"
+    assert chunks[1] == {"failover": "dying"}
+    assert chunks[2]["message"]["content"] == "from healthy"
+    assert chunks[-1]["done"]
+    assert not pool.hosts[0].healthy
+    assert pool.hosts[1].stats["requests"] == 1
+
+
+def test_embeddings_are_routed_through_the_pool(delta, stand_ins, monkeypatch):
+    server = stand_ins("embedder")
+    pool = make_pool(delta, server)
+    monkeypatch.setattr(delta, "get_host_pool", lambda: pool)
+    monkeypatch.setattr(delta, "get_ollama_client", lambda: pytest.fail("embedding bypassed the host pool"))
+    vectors = delta.embed_texts("m", ["one", "two"])
+    assert vectors.shape == (2, 2)
+    assert server.requests == 1
@@ -0,0 +1,59 @@
+import json
+
+
+class FakeClient:
+    def __init__(self):
+        self.models = ["a:latest"]
+        self.calls = 0
+
+    def list(self):
+        self.calls += 1
+        return {"models": [{"model": name, "size": 1, "digest": "d", "modified_at": None, "details": {}} for name in self.models]}
+
+
+def setup_registry(delta, tmp_path, monkeypatch, host):
+    (tmp_path / ".ollama" / "models" / "manifests").mkdir(parents=True)
+    client = FakeClient()
+    monkeypatch.setattr(delta, "get_ollama_client", lambda: client)
+    monkeypatch.setattr(delta, "get_host_pool", lambda: None)
+    delta.configure_ollama_client(host=host)
+    return client
+
+
+def age_registry(delta, seconds):
+    registry = json.loads(delta.MODEL_REGISTRY_FILE.read_text())
+    registry["fetched"] -= seconds
+    delta.MODEL_REGISTRY_FILE.write_text(json.dumps(registry))
+
+
+def test_local_host_cache_follows_manifests(delta, tmp_path, monkeypatch):
+    client = setup_registry(delta, tmp_path, monkeypatch, "127.0.0.1:11434")
+    delta.installed_models()
+    age_registry(delta, delta.MODEL_REGISTRY_TTL + 1)
+    delta.installed_models()
+    assert client.calls == 1
+
+
+def test_remote_host_cache_expires_despite_local_manifests(delta, tmp_path, monkeypatch):
+    client = setup_registry(delta, tmp_path, monkeypatch, "http://10.0.0.5:11434")
+    delta.installed_models()
+    delta.installed_models()
+    assert client.calls == 1
+
+    client.models.append("b:latest")
+    age_registry(delta, delta.MODEL_REGISTRY_TTL + 1)
+    assert [m["model"] for m in delta.installed_models()] == ["a:latest", "b:latest"]
+    assert client.calls == 2
+
+
+def test_untagged_name_matches_cached_latest(delta, tmp_path, monkeypatch):
+    client = setup_registry(delta, tmp_path, monkeypatch, "http://10.0.0.5:11434")
+    assert delta.is_model_available("a")
+    assert delta.is_model_available("a:latest")
+    assert client.calls == 1
+
+def test_is_local_host(delta):
+    for host in ("", "127.0.0.1:11434", "http://localhost:11434", "0.0.0.0", "http://[::1]:11434"):
+        assert delta.is_local_host(host), host
+    for host in ("10.0.0.5:11434", "https://ollama.example.com", "gpu-box"):
+        assert not delta.is_local_host(host), host
@@ -0,0 +1,33 @@
+import time
+
+
+def test_stale_ddg_result_counts_one_miss(delta, monkeypatch):
+    monkeypatch.setattr(delta, "schedule_ddg_refresh", lambda query: None)
+    delta.retrieval_cache_put("ddg", "old news", ("context", ["https://example.com"], [], ""))
+    conn = delta.open_retrieval_cache()
+    with conn:
+        conn.execute("UPDATE entries SET created = ?", (time.time() - 10 * 24 * 3600,))
+    conn.close()
+    delta._update_ddg_bucket(drain=True)
+
+    assert delta.fetch_duckduckgo_context("old news")[0] == "context"
+    stats = delta.retrieval_cache_stats()["ddg"]
+    assert (stats["hits"], stats["misses"]) == (0, 1)
+
+
+def test_fresh_hit_counts_one_hit(delta):
+    delta.retrieval_cache_put("ddg", "news", ("context", [], [], ""))
+    assert delta.fetch_duckduckgo_context("news")[0] == "context"
+    stats = delta.retrieval_cache_stats()["ddg"]
+    assert (stats["hits"], stats["misses"]) == (1, 0)
+
+
+def test_cache_stats_do_not_write_state(delta, tmp_path):
+    delta.display_cache_stats()
+    assert not delta.DDG_BUCKET_FILE.exists()
+    assert not delta.RETRIEVAL_CACHE_FILE.exists()
+
+    delta._update_ddg_bucket(take=1)
+    before = delta.DDG_BUCKET_FILE.read_text()
+    delta.display_cache_stats()
+    assert delta.DDG_BUCKET_FILE.read_text() == before
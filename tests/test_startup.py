@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from conftest import ROOT
+
+# Modules that only specific commands need; `delta list` must not pay for them
+HEAVY_MODULES = ["numpy", "ollama", "httpx", "rich.markdown", "PyPDF2", "docx", "prompt_toolkit", "pynvml"]
+
+
+def cached_model_list(delta):
+    """A fresh model registry, so `delta list` can answer without contacting Ollama."""
+    delta.MODEL_REGISTRY_FILE.parent.mkdir(parents=True, exist_ok=True)
+    delta.MODEL_REGISTRY_FILE.write_text(json.dumps({
+        "host": "",
+        "manifest_mtime": delta.manifest_mtime(),
+        "fetched": time.time(),
+        "models": [{"model": "llama3.1:latest", "size": 4_900_000_000, "digest": "d", "modified_at": None, "details": {}}],
+    }))
+
+
+def run_delta(tmp_path, *args):
+    env = {**os.environ, "HOME": str(tmp_path), "USERPROFILE": str(tmp_path), "COLUMNS": "200"}
+    env.pop("OLLAMA_HOST", None)
+    return subprocess.run([sys.executable, *args], cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120)
+
+
+def test_list_cold_start_within_budget(delta, tmp_path):
+    cached_model_list(delta)
+    result = run_delta(tmp_path, str(ROOT / "delta.py"), "--startup-profile", "list")
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "Within the" in result.stdout
+
+
+def test_list_does_not_import_heavy_modules(delta, tmp_path):
+    cached_model_list(delta)
+    result = run_delta(tmp_path, "-X", "importtime", str(ROOT / "delta.py"), "list")
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "llama3.1:latest" in result.stdout
+    imported = {line.rsplit("|", 1)[1].strip() for line in result.stderr.splitlines() if line.startswith("import time:")}
+    assert not imported & set(HEAVY_MODULES), sorted(imported & set(HEAVY_MODULES))